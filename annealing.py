@@ -0,0 +1,76 @@
+import numpy as np
+import seeders
+from distances import PointStore
+from moves import OrOptMove, SwapMove, Tour, TwoOptMove
+from spatial import neighbour_lists
+
+INITIAL_TEMPERATURE = 300
+SEEDED_ACCEPTANCE = 0.05
+STOPPING_TEMPERATURE = 1
+TEMPERATURE_SAMPLES = 64
+NEIGHBOURS = 8
+BLOCK = 1024
+MOVES = (TwoOptMove(), OrOptMove(), SwapMove())
+# moves of the annealing kernel
+KERNEL_MOVES = MOVES[:2]
+
+# annealing of a single route, shared by the two-level solver in helicopters and the parallel runners
+
+def Random(rng):
+    # source of random numbers, global numpy state unless a generator or Uniforms is given
+    # entry points like Solve take seeds and spawn generators for the functions they call
+    return np.random if rng is None else rng
+
+def Initialize(count, rng=None):
+    # shuffle initial solution
+    solution = np.arange(count)
+    Random(rng).shuffle(solution)
+    return solution
+
+def Route(targets, rng=None, seeder=None):
+    # tour over targets with nearest neighbour candidate lists, random unless seeder names one of seeders.SEEDERS
+    store = PointStore(targets)
+    order = Initialize(len(targets), rng) if seeder is None else seeders.SEEDERS[seeder](store.points)
+    return Tour(store, order, neighbour_lists(store.points, NEIGHBOURS))
+
+def Evaluate(store, solution):
+    # fitness function - sum of all distances
+    return store.tour_length(solution)
+
+def Modify(tour, operators=None, rng=None):
+    # propose random move of one of the operators, returns operator and move
+    operators = operators or MOVES
+    rng = Random(rng)
+    operator = operators[int(rng.random() * len(operators))]
+    move = operator.propose(tour, rng)
+    if move is None:
+        return None
+    return operator, move
+
+def Accept(delta, temperature, rng=None):
+    # metropolis criterion
+    if delta < 0:
+        return True
+    return np.exp(-delta / temperature) > Random(rng).random()
+
+def AnnealStep(tour, score, temperature, rng=None, operators=None):
+    # propose one move and apply it in place when accepted, returns current and proposed score
+    proposal = Modify(tour, operators, rng)
+    if proposal is None:
+        return score, score
+    operator, move = proposal
+    new_score = score + operator.delta(tour, move)
+    if Accept(new_score - score, temperature, rng):
+        operator.apply(tour, move)
+        return new_score, new_score
+    return score, new_score
+
+def SampleDeltas(tour, count, rng=None, operators=None):
+    # length changes of random moves, none of them is applied
+    deltas = []
+    for _ in range(count):
+        proposal = Modify(tour, operators, rng)
+        if proposal is not None:
+            operator, move = proposal
+            deltas.append(operator.delta(tour, move))
+    return deltas
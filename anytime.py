@@ -0,0 +1,32 @@
+import threading
+import time
+
+# helpers for anytime solvers, generators of improving results that ask a stop callable when they may end early
+# helicopters.FindingBestRoutes and steiner.steiner_improvements yield (score, solution, elapsed seconds)
+
+class Deadline:
+    # stop condition true once seconds passed since it was created or cancel was called, from any thread
+    def __init__(self, seconds=None, clock=time.perf_counter):
+        self.clock = clock
+        self.end = None if seconds is None else clock() + seconds
+        self.cancelled = threading.Event()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def remaining(self):
+        return None if self.end is None else max(self.end - self.clock(), 0.0)
+
+    def __call__(self):
+        return self.cancelled.is_set() or (self.end is not None and self.clock() >= self.end)
+
+def collect(improvements, callback=None):
+    # run an anytime generator to its end and return its last, best result, None when it yielded nothing
+    # callback is called with every result, returning False from it closes the generator
+    best = None
+    for improvement in improvements:
+        best = improvement
+        if callback is not None and callback(improvement) is False:
+            improvements.close()
+            break
+    return best
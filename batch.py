@@ -0,0 +1,116 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import numpy as np
+import anytime
+import helicopters
+import steiner
+import tsplib
+from executors import bounded_map
+from route_cache import RouteCache
+
+KINDS = ("routes", "steiner")
+WINDOW_PER_WORKER = 4
+WARMUP_TARGETS = 12
+
+# batches of small routing and steiner instances solved over a pool of warm worker processes
+# instances are json objects, one per line in .jsonl files:
+#   {"id": ..., "kind": "routes", "helicopters": [[x, y], ...], "targets": [[x, y], ...], "budget": seconds, "seed": int}
+#   {"id": ..., "kind": "steiner", "points": [[x, y], ...], "budget": seconds}
+# a TSPLIB file is one instance, a single route from its first node over the others or a steiner tree of its nodes
+
+def read_instances(paths, kind="routes"):
+    # instances of .jsonl and TSPLIB files in order, "-" reads json lines from stdin as they arrive
+    for path in paths:
+        if path == "-":
+            yield from _json_lines(sys.stdin, "-")
+        elif path.endswith(".jsonl"):
+            with open(path) as file:
+                yield from _json_lines(file, path)
+        else:
+            problem = tsplib.load(path)
+            coordinates = problem.coordinates.tolist()
+            if kind == "steiner":
+                yield {"id": problem.name, "kind": kind, "points": coordinates}
+            else:
+                yield {"id": problem.name, "kind": kind, "helicopters": coordinates[:1], "targets": coordinates[1:]}
+
+def _json_lines(file, path):
+    # a line that is not a json object becomes an instance carrying its error, the others still run
+    for number, line in enumerate(file, 1):
+        if not line.strip():
+            continue
+        try:
+            instance = json.loads(line)
+            if not isinstance(instance, dict):
+                raise ValueError(f"expected a json object, got {type(instance).__name__}")
+        except ValueError as error:
+            yield {"id": f"{path}:{number}", "error": str(error)}
+            continue
+        instance.setdefault("id", f"{path}:{number}")
+        yield instance
+
+def solve(instance, budget=None):
+    # result of one instance as json serializable dict, errors are reported in it instead of raised
+    # budget in seconds applies to instances without their own, routes fit their cooling to it and steiner trees stop at it
+    if "error" in instance:
+        # the instance could not be read
+        return {"id": instance.get("id"), "kind": instance.get("kind"), "error": instance["error"], "seconds": 0.0}
+    started = time.perf_counter()
+    result = {"id": instance.get("id"), "kind": instance.get("kind", "routes")}
+    try:
+        budget = instance.get("budget", budget)
+        if result["kind"] == "routes":
+            schedules = helicopters.Schedules(budget=budget, seeded=True)
+            # a cache per instance keeps results independent of which worker solved which instances before
+            _, fleet, solutions = helicopters.Solve(instance["targets"], np.asarray(instance["helicopters"], dtype=np.float64).reshape(-1, 2), cache=RouteCache(), schedules=schedules, rng=instance.get("seed"), seeder=helicopters.SEEDER)
+            result.update(helicopters.Results(fleet, solutions))
+        elif result["kind"] == "steiner":
+            length, tree, _ = anytime.collect(steiner.steiner_improvements(instance["points"], stop=anytime.Deadline(budget)))
+            result.update(length=length, steiner_points=tree.steiner_points.tolist(), edges=tree.edges.tolist())
+        else:
+            raise ValueError(f"unknown kind {result['kind']!r}, expected one of {', '.join(KINDS)}")
+    except Exception as error:
+        result["error"] = f"{type(error).__name__}: {error}"
+    result["seconds"] = time.perf_counter() - started
+    return result
+
+def _warm_up():
+    # solve tiny instances once, so compiled kernels and lazily built state are ready before the first real one
+    rng = np.random.default_rng(0)
+    solve({"kind": "routes", "helicopters": [[0, 0], [1, 1]], "targets": rng.random((WARMUP_TARGETS, 2)).tolist(), "seed": 0})
+    solve({"kind": "steiner", "points": rng.random((WARMUP_TARGETS, 2)).tolist()})
+
+def solve_batch(instances, workers=None, budget=None, window=None):
+    # results of instances in their order, solved in a pool of worker processes started and warmed up once
+    # instances are read lazily with at most window of them pending, so a stream of them is solved as it arrives
+    workers = workers or os.cpu_count()
+    window = window or WINDOW_PER_WORKER * workers
+    with ProcessPoolExecutor(workers, initializer=_warm_up) as executor:
+        yield from bounded_map(executor, partial(solve, budget=budget), instances, window)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve batches of routing and Steiner instances over a pool of worker processes.")
+    parser.add_argument("paths", nargs="+", metavar="PATH", help=".jsonl files with one instance per line, TSPLIB files or - for json lines from stdin")
+    parser.add_argument("--kind", choices=KINDS, default="routes", help="problem solved for TSPLIB instances")
+    parser.add_argument("--workers", type=int, help="worker processes, all cores by default")
+    parser.add_argument("--budget", type=float, metavar="SECONDS", help="time budget of instances without their own")
+    parser.add_argument("--output", help="write results as json lines to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    output = sys.stdout if args.output is None else open(args.output, "w")
+    try:
+        # results are written and flushed one at a time, in the order of the instances
+        for result in solve_batch(read_instances(args.paths, args.kind), args.workers, args.budget):
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+if __name__ == "__main__":
+    main()
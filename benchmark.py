@@ -0,0 +1,132 @@
+import argparse
+import json
+import os
+import time
+import tracemalloc
+import numpy as np
+import annealing
+import kernels
+import tsplib
+from sampling import Uniforms
+from steiner import PARTITION_SIZE, partitioned_steiner_tree, steiner_tree
+
+PR107 = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pr107.tsp")
+SIZES = (250, 500, 1000)
+ITERATIONS = 100000
+EXTENT = 10000
+STEINER_SOLVERS = ("steiner", "partitioned")
+
+def generated(size, seed):
+    # uniformly random instance in a square
+    rng = np.random.default_rng(seed)
+    coordinates = rng.uniform(0, EXTENT, (size, 2))
+    return tsplib.Problem(f"random{size}", coordinates, "EUC_2D")
+
+def anneal_route(coordinates, iterations, seed):
+    # single route annealing with geometric cooling spread over given number of iterations
+    rng = Uniforms(np.random.default_rng(seed))
+    tour = annealing.Route(coordinates, rng)
+    score = annealing.Evaluate(tour.store, tour.order)
+    temperature = annealing.INITIAL_TEMPERATURE
+    decay = (annealing.STOPPING_TEMPERATURE / temperature) ** (1 / iterations)
+    for _ in range(iterations):
+        score, _ = annealing.AnnealStep(tour, score, temperature, rng)
+        temperature *= decay
+    return tour.order
+
+def anneal_kernel(coordinates, iterations, seed):
+    # the same cooling run in blocks of the annealing kernel
+    rng = np.random.default_rng(seed)
+    tour = annealing.Route(coordinates, rng)
+    score = annealing.Evaluate(tour.store, tour.order)
+    temperatures = annealing.INITIAL_TEMPERATURE * (annealing.STOPPING_TEMPERATURE / annealing.INITIAL_TEMPERATURE) ** (np.arange(iterations) / iterations)
+    for start in range(0, iterations, annealing.BLOCK):
+        score, _ = kernels.anneal(tour, score, temperatures[start:start + annealing.BLOCK], rng)
+    return tour.order
+
+def steiner(coordinates):
+    return steiner_tree(coordinates)
+
+def partitioned(coordinates, leaf_size, workers):
+    return partitioned_steiner_tree(coordinates, leaf_size, workers)
+
+def measure(function, args, memory):
+    # wall time of one run, peak traced memory of a second run with the same arguments, seeds among them
+    start = time.perf_counter()
+    result = function(*args)
+    seconds = time.perf_counter() - start
+    peak = None
+    if memory:
+        tracemalloc.start()
+        function(*args)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result, seconds, peak
+
+def run(problems, iterations, seed, memory, solvers, leaf_size=PARTITION_SIZE, workers=None):
+    # benchmark records for every problem and solver
+    records = []
+    for problem in problems:
+        for solver, function in (("anneal", anneal_route), ("kernel", anneal_kernel)):
+            if solver in solvers:
+                solution, seconds, peak = measure(function, (problem.coordinates, iterations, seed), memory)
+                length = problem.tour_length(solution)
+                records.append(record(problem, solver, seconds, peak, length, iterations))
+        if "steiner" in solvers:
+            graph, seconds, peak = measure(steiner, (problem.coordinates,), memory)
+            records.append(record(problem, "steiner", seconds, peak, graph.total_length))
+        if "partitioned" in solvers:
+            (graph, stages), seconds, peak = measure(partitioned, (problem.coordinates, leaf_size, workers), memory)
+            records.append(record(problem, "partitioned", seconds, peak, graph.total_length, stages=stages))
+    return records
+
+def record(problem, solver, seconds, peak, length, iterations=None, stages=None):
+    optimum = problem.optimum if solver not in STEINER_SOLVERS else None
+    return {
+        "instance": problem.name,
+        "size": len(problem),
+        "solver": solver,
+        "seconds": seconds,
+        "iterations": iterations,
+        "iterations_per_second": iterations / seconds if iterations else None,
+        "peak_memory": peak,
+        "length": float(length),
+        "optimum": optimum,
+        "gap": (length - optimum) / optimum if optimum else None,
+        "stages": stages,
+    }
+
+def report(records):
+    print(f"{'instance':<14}{'solver':<12}{'size':>8}{'seconds':>10}{'it/s':>12}{'peak MiB':>10}{'length':>14}{'gap %':>8}")
+    for item in records:
+        rate = f"{item['iterations_per_second']:.0f}" if item["iterations_per_second"] else "-"
+        peak = f"{item['peak_memory'] / 2 ** 20:.2f}" if item["peak_memory"] is not None else "-"
+        gap = f"{100 * item['gap']:.2f}" if item["gap"] is not None else "-"
+        print(f"{item['instance']:<14}{item['solver']:<12}{item['size']:>8}{item['seconds']:>10.3f}{rate:>12}{peak:>10}{item['length']:>14.1f}{gap:>8}")
+        if item["stages"]:
+            print(" " * 14 + "  ".join(f"{name} {seconds:.3f}s" for name, seconds in item["stages"].items()))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the route annealer and the Steiner tree solver.")
+    parser.add_argument("--tsp", nargs="*", default=[PR107], help="TSPLIB instances")
+    parser.add_argument("--sizes", nargs="*", type=int, default=list(SIZES), help="sizes of generated instances")
+    parser.add_argument("--iterations", type=int, default=ITERATIONS, help="annealing iterations per instance")
+    parser.add_argument("--solvers", nargs="+", choices=("anneal", "kernel", "steiner", "partitioned"), default=["anneal", "kernel", "steiner"])
+    parser.add_argument("--leaf-size", type=int, default=PARTITION_SIZE, help="terminals per part of the partitioned steiner solver")
+    parser.add_argument("--workers", type=int, help="processes of the partitioned steiner solver")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="skip the traced run measuring peak memory")
+    parser.add_argument("--json", help="append records as JSON lines to this file")
+    args = parser.parse_args(argv)
+
+    problems = [tsplib.load(path) for path in args.tsp]
+    problems += [generated(size, args.seed + size) for size in args.sizes]
+    records = run(problems, args.iterations, args.seed, not args.no_memory, args.solvers, args.leaf_size, args.workers)
+    report(records)
+    if args.json is not None:
+        with open(args.json, "a") as file:
+            for item in records:
+                file.write(json.dumps(item) + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+FORMAT_VERSION = 1
+INTERVAL = 60.0
+
+# state of a run as named arrays and json serializable meta data in one compressed npz file
+
+def write(path, arrays, meta):
+    # the file is replaced at once, a crash while writing leaves the previous checkpoint
+    temporary = path + ".tmp"
+    meta = dict(meta, version=FORMAT_VERSION)
+    with open(temporary, "wb") as file:
+        np.savez_compressed(file, meta=np.frombuffer(json.dumps(meta).encode(), dtype=np.uint8), **arrays)
+    os.replace(temporary, path)
+
+def read(path):
+    with np.load(path) as data:
+        meta = json.loads(data["meta"].tobytes())
+        if meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"{path}: unsupported checkpoint version {meta.get('version')}")
+        arrays = {name: data[name] for name in data.files if name != "meta"}
+    return arrays, meta
+
+def pack(arrays):
+    # arrays of different lengths as one array and their lengths
+    arrays = list(arrays)
+    lengths = np.array([len(array) for array in arrays], dtype=np.intp)
+    values = np.concatenate(arrays) if arrays else np.empty(0, dtype=np.intp)
+    return values, lengths
+
+def unpack(values, lengths):
+    return np.split(values, np.cumsum(lengths)[:-1]) if len(lengths) else []
+
+class Checkpointer:
+    # periodic checkpoints written to path by a background thread
+    # a checkpoint is due once interval seconds passed since the last one and the last one is written
+    def __init__(self, path, interval=INTERVAL, clock=time.perf_counter):
+        self.path = path
+        self.interval = interval
+        self.clock = clock
+        self.last = clock()
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.future = None
+        self.written = 0
+
+    def due(self):
+        if self.future is not None and not self.future.done():
+            return False
+        return self.clock() - self.last >= self.interval
+
+    def save(self, arrays, meta):
+        # arrays must not change after they are handed over
+        if self.future is not None:
+            # errors of the previous write surface here
+            self.future.result()
+        self.last = self.clock()
+        self.future = self.executor.submit(write, self.path, arrays, meta)
+        self.written += 1
+
+    def close(self):
+        # wait for the last checkpoint
+        if self.future is not None:
+            self.future.result()
+        self.executor.shutdown()
@@ -0,0 +1,44 @@
+import numpy as np
+
+DENSE_LIMIT = 2000
+
+class PointStore:
+    # coordinates of points with cached euclidean distances
+    # small instances use a dense matrix, large ones compute distances of the pairs asked for
+    def __init__(self, points, dense_limit=DENSE_LIMIT):
+        self.points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        self.dense = len(self.points) <= dense_limit
+        self._matrix = None
+
+    def __len__(self):
+        return len(self.points)
+
+    @property
+    def matrix(self):
+        # full distance matrix, computed on first use
+        if self._matrix is None:
+            delta_x = np.subtract.outer(self.points[:, 0], self.points[:, 0])
+            delta_y = np.subtract.outer(self.points[:, 1], self.points[:, 1])
+            self._matrix = np.hypot(delta_x, delta_y)
+        return self._matrix
+
+    def distance(self, i, j):
+        # distance of points i and j
+        if self.dense:
+            return float(self.matrix[i, j])
+        delta = self.points[i] - self.points[j]
+        return float(np.hypot(delta[0], delta[1]))
+
+    def pairs(self, first, second):
+        # distances of points first[k] and second[k] for index arrays, gathered from the matrix once it exists
+        if self._matrix is not None:
+            return self._matrix[first, second]
+        delta = self.points[first] - self.points[second]
+        return np.hypot(delta[..., 0], delta[..., 1])
+
+    def tour_length(self, solution):
+        # length of closed route visiting points in order of solution
+        solution = np.asarray(solution)
+        if len(solution) < 2:
+            return 0.0
+        return float(np.sum(self.pairs(solution, np.roll(solution, -1)), dtype=np.float64))
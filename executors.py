@@ -0,0 +1,13 @@
+from collections import deque
+
+# helpers for concurrent.futures executors shared by the solvers
+
+def bounded_map(executor, function, inputs, window):
+    # results in order with at most window tasks submitted, so inputs are materialized a few at a time
+    pending = deque()
+    for item in inputs:
+        pending.append(executor.submit(function, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
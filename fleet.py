@@ -0,0 +1,113 @@
+import numpy as np
+
+CAPACITY = 16
+
+class Fleet:
+    # targets assigned to vehicles in flat arrays, coordinates are the targets followed by the depots of vehicles
+    # indices(v) are the targets of vehicle v followed by its depot and slots[i] is the position of point i there
+    # routes of vehicles are permutations of these positions, moves change the arrays in place and undo reverts the last one
+    def __init__(self, targets, depots, owners):
+        targets = np.asarray(targets, dtype=np.float64).reshape(-1, 2)
+        depots = np.asarray(depots, dtype=np.float64).reshape(-1, 2)
+        self.size = len(targets)
+        self.coordinates = np.ascontiguousarray(np.concatenate((targets, depots)))
+        self.assign(owners)
+
+    @property
+    def targets(self):
+        return self.coordinates[:self.size]
+
+    @property
+    def depots(self):
+        return self.coordinates[self.size:]
+
+    def assign(self, owners):
+        # rebuild lists of all vehicles from owner of every target, targets of a vehicle are ordered by index
+        self.owners = np.array(owners, dtype=np.intp).reshape(-1)
+        vehicles = len(self.depots)
+        self.counts = np.bincount(self.owners, minlength=vehicles)
+        self.slots = np.empty(len(self.coordinates), dtype=np.intp)
+        self.lists = []
+        grouped = np.argsort(self.owners, kind="stable")
+        starts = np.concatenate(([0], np.cumsum(self.counts)))
+        for vehicle in range(vehicles):
+            count = self.counts[vehicle]
+            indices = np.empty(max(CAPACITY, 2 * (count + 1)), dtype=np.intp)
+            indices[:count] = grouped[starts[vehicle]:starts[vehicle + 1]]
+            indices[count] = self.size + vehicle
+            self.slots[indices[:count + 1]] = np.arange(count + 1)
+            self.lists.append(indices)
+
+    def load(self, lists):
+        # take over lists of all vehicles as given by indices, e.g. saved from a fleet over the same points
+        self.counts = np.array([len(indices) - 1 for indices in lists], dtype=np.intp)
+        self.owners = np.empty(self.size, dtype=np.intp)
+        self.slots = np.empty(len(self.coordinates), dtype=np.intp)
+        self.lists = []
+        for vehicle, indices in enumerate(lists):
+            members = np.empty(max(CAPACITY, 2 * len(indices)), dtype=np.intp)
+            members[:len(indices)] = indices
+            self.owners[indices[:-1]] = vehicle
+            self.slots[indices] = np.arange(len(indices))
+            self.lists.append(members)
+
+    def indices(self, vehicle):
+        # targets of vehicle followed by its depot, a view valid until the next move
+        return self.lists[vehicle][:self.counts[vehicle] + 1]
+
+    def route(self, vehicle, solution):
+        # point indices of a route in visiting order
+        return self.indices(vehicle)[solution]
+
+    def solution(self, vehicle, route):
+        # positions of route points in the list of vehicle, inverse of route
+        return self.slots[route]
+
+    def move(self, target, destination):
+        # move target to the end of the list of destination, its place in the old list takes the last target there
+        # returns the record undo needs
+        source = self.owners[target]
+        slot = self.slots[target]
+        members = self.lists[source]
+        count = self.counts[source] - 1
+        last = members[count]
+        members[slot] = last
+        self.slots[last] = slot
+        self.place(source, count)
+        self.counts[source] = count
+        self.append(destination, target)
+        self.owners[target] = destination
+        return target, source, slot
+
+    def undo(self, record):
+        # revert the last move, positions of all points are restored
+        target, source, slot = record
+        destination = self.owners[target]
+        count = self.counts[destination] - 1
+        self.place(destination, count)
+        self.counts[destination] = count
+        members = self.lists[source]
+        count = self.counts[source]
+        displaced = members[slot]
+        members[count] = displaced
+        self.slots[displaced] = count
+        members[slot] = target
+        self.slots[target] = slot
+        self.place(source, count + 1)
+        self.counts[source] = count + 1
+        self.owners[target] = source
+
+    def append(self, vehicle, target):
+        count = self.counts[vehicle]
+        if count + 2 > len(self.lists[vehicle]):
+            self.lists[vehicle] = np.concatenate((self.lists[vehicle], np.empty(len(self.lists[vehicle]), dtype=np.intp)))
+        self.lists[vehicle][count] = target
+        self.slots[target] = count
+        self.place(vehicle, count + 1)
+        self.counts[vehicle] = count + 1
+
+    def place(self, vehicle, position):
+        # put depot of vehicle at given position of its list
+        depot = self.size + vehicle
+        self.lists[vehicle][position] = depot
+        self.slots[depot] = position
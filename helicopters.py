@@ -1,114 +1,133 @@
+import argparse
+import copy
+import math
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 import numpy as np
-import cv2
-
-def Generate(width, height, count):
-    # method to generate random targets
-    targets = []
-    for i in range(count):
-        position_x = np.random.randint(width)
-        position_y = np.random.randint(height - 165) + 160
-        targets.append((position_x, position_y))
-    return targets
-
-def Initialize(count):
-    # shuffle initial solution
-    solution = np.arange(count)
-    np.random.shuffle(solution)
-    return solution
-
-def Evaluate(targets, solution):
-    # fitness function - sum of all distances
-    distance = 0
-    for i in range(len(targets)):
-        index_a = solution[i]
-        index_b = solution[i - 1]
-        dst= get_distance(targets[index_a], targets[index_b])
-        distance += dst
-    return distance
-
-def get_distance(target1, target2):
-    # distance of two points
-    delta_x = target1[0] - target2[0]
-    delta_y = target1[1] - target2[1]
-    return (delta_x ** 2 + delta_y ** 2) ** 0.5
-
-def Modify(current):
-    # randomly swap two positions in current solution 
-    new = current.copy()
-    if len(new) == 1: 
-        return new 
-    index_a = np.random.randint(len(current))
-    index_b = np.random.randint(len(current))
-    while index_b == index_a:
-        index_b = np.random.randint(len(current))
-    new[index_a], new[index_b] = new[index_b], new[index_a]
-    return new
-
-def ModifyTargets(targets_a, targets_b, helicopters): 
-    # randomly assign one target to different helicopter 
-    new_a = targets_a.copy()
-    new_b = targets_b.copy()
-    random_number = np.random.uniform()
-    if (random_number >= 0.5 and len(new_a) > 0) or (random_number < 0.5 and len(new_b) == 0):
-        distances = [get_distance(target, helicopters[1]) for target in new_a]
-        distances = np.array(distances)
-        probabilities = 1 / distances**2
-        probabilities /= np.sum(probabilities)
-        index_a = np.random.choice(len(new_a), p=probabilities)
-        item = new_a.pop(index_a)
-        new_b.append(item)
-    else: 
-        distances = [get_distance(target, helicopters[0]) for target in new_b]
-        distances = np.array(distances)
-        probabilities = 1 / distances
-        probabilities /= np.sum(probabilities)
-        index_b = np.random.choice(len(new_b), p=probabilities)
-        item = new_b.pop(index_b)
-        new_a.append(item)          
-
-    return new_a, new_b
-
-def DrawPoints(width, height, targets_a, targets_b, helicopters, button_x, button_y, button_height, button_width):
+import checkpoint as checkpoints
+import kernels
+import loaders
+import parallel
+import seeders
+from annealing import BLOCK, INITIAL_TEMPERATURE, KERNEL_MOVES, SEEDED_ACCEPTANCE, STOPPING_TEMPERATURE, TEMPERATURE_SAMPLES, Evaluate, Random, Route, SampleDeltas
+from distances import PointStore
+from fleet import Fleet
+from rendering import Mailbox
+from route_cache import MAX_SIZE, RouteCache
+from sampling import Uniforms, WeightTree, streams
+from schedules import INITIAL_ACCEPTANCE, Geometric, LundyMees, Schedule, Timed, TimedLundyMees, initial_temperature
+from spatial import nearest_sites
+from tracing import Tracer
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+def Generate(width, height, count, rng=None):
+    # method to generate random targets, (count, 2) array
+    uniform = Random(rng).random((count, 2))
+    position_x = (uniform[:, 0] * width).astype(int)
+    position_y = (uniform[:, 1] * (height - 165)).astype(int) + 160
+    return np.column_stack((position_x, position_y))
+
+def BoundaryWeights(fleet, candidates, targets):
+    # how much moving targets is worth, distance to own helicopter relative to the closest other one
+    # about 0.5 near the split between the two, close to 1 for targets owned by a far helicopter and never below BOUNDARY_FLOOR
+    targets = np.asarray(targets, dtype=np.intp)
+    owners = fleet.owners[targets]
+    nearest = candidates[targets, 0]
+    others = np.where(nearest == owners, candidates[targets, 1], nearest)
+    points = fleet.targets[targets]
+    own = np.hypot(*(fleet.depots[owners] - points).T)
+    other = np.hypot(*(fleet.depots[others] - points).T)
+    return np.maximum(own / np.maximum(own + other, COINCIDENCE), BOUNDARY_FLOOR)
+
+def ModifyTargets(fleet, candidates, weights, rng=None):
+    # move a target drawn by its boundary weight to one of the other helicopters close to it, nearer helicopters are more likely
+    # candidates are indices of the helicopters closest to every target, weights a WeightTree of BoundaryWeights
+    # returns target, source and destination
+    rng = Random(rng)
+    target = weights.sample(rng.random())
+    source = fleet.owners[target]
+    choices = candidates[target]
+    choices = choices[choices != source]
+    delta = fleet.depots[choices] - fleet.targets[target]
+    closeness = 1 / np.maximum(np.hypot(delta[:, 0], delta[:, 1]), COINCIDENCE)
+    cumulative = np.cumsum(closeness)
+    destination = choices[np.searchsorted(cumulative, rng.random() * cumulative[-1], side="right")]
+    return target, source, destination
+
+def ReassignDelta(fleet, solutions, target, source, destination):
+    # estimated change of total length when target moves, it leaves its route and joins the other at the cheapest place
+    route = fleet.coordinates[fleet.route(source, solutions[source])]
+    position = np.flatnonzero(solutions[source] == fleet.slots[target])[0]
+    before, after = route[position - 1], route[(position + 1) % len(route)]
+    point = fleet.targets[target]
+    removal = math.dist(before, point) + math.dist(point, after) - math.dist(before, after)
+    route = fleet.coordinates[fleet.route(destination, solutions[destination])]
+    following = np.roll(route, -1, axis=0)
+    insertion = np.hypot(*(route - point).T) + np.hypot(*(following - point).T) - np.hypot(*(following - route).T)
+    return float(insertion.min()) - removal
+
+def SplitTargets(targets, helicopters):
+    # assign every target to the closest helicopter
+    groups = [[] for _ in helicopters]
+    if len(targets) == 0:
+        return groups
+    for target, owner in zip(targets, nearest_sites(targets, helicopters)[:, 0]):
+        groups[owner].append(target)
+    return groups
+
+def Colors(count):
+    # helicopter, target and route colour of every helicopter, the first two keep their original colours
+    colors = [(BLUE, YELLOW, GREEN), (RED, PINK, WHITE)]
+    for hue in (HUE_OFFSET + np.arange(max(count - len(colors), 0)) * HUE_STEP) % 180:
+        hsv = np.array([[[hue, 255, 255], [hue, 255, 170], [hue, 110, 255]]], dtype=np.uint8)
+        colors.append(tuple(tuple(int(channel) for channel in color) for color in cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR)[0]))
+    return colors[:count]
+
+def Disks(frame, points, color):
+    # filled circles of RADIUS at integer points, drawn by one fancy index instead of a call per point
+    ys = (points[:, 1, None] + DISK_Y).ravel()
+    xs = (points[:, 0, None] + DISK_X).ravel()
+    inside = (ys >= 0) & (ys < frame.shape[0]) & (xs >= 0) & (xs < frame.shape[1])
+    frame[ys[inside], xs[inside]] = color
+
+def DrawPoints(frame, targets, helicopters, button_x, button_y, button_height, button_width):
     # draw innitial targets and helicopters
-    frame = np.zeros((height, width, 3))
+    frame.fill(0)
     cv2.rectangle(frame, (button_x, button_y), (button_x + button_width, button_y + button_height), WHITE, -1)
     cv2.putText(frame, "RUN", (button_x + 10, button_y + 30), FONT, SIZE, GREEN)
-    for target in targets_a:
-        cv2.circle(frame, (target[0], target[1]), 5, YELLOW, -1)
-        
-    for target in targets_b:
-        cv2.circle(frame, (target[0], target[1]), 5, PINK, -1)
-
-    cv2.circle(frame, (helicopters[0][0], helicopters[0][1]), 5, BLUE, -1)
-    if len(helicopters) ==2:
-        cv2.circle(frame, (helicopters[1][0], helicopters[1][1]), 5, RED, -1)
-    cv2.imshow("Simulated Annealing", frame)    
-
-def Draw(width, height, targets_a, targets_b, helicopters, solution_a, solution_b, infos):
-    # draw simulation
-    frame = np.zeros((height, width, 3))
-    for i in range(len(targets_a)):
-        index_a = solution_a[i]
-        index_b = solution_a[i - 1]
-        point_a = (targets_a[index_a][0], targets_a[index_a][1])
-        point_b = (targets_a[index_b][0], targets_a[index_b][1])
-        cv2.line(frame, point_a, point_b, GREEN, 2)
-
-    for i in range(len(targets_b)):
-        index_a = solution_b[i]
-        index_b = solution_b[i - 1]
-        point_a = (targets_b[index_a][0], targets_b[index_a][1])
-        point_b = (targets_b[index_b][0], targets_b[index_b][1])
-        cv2.line(frame, point_a, point_b, WHITE, 2)
-
-    for target in targets_a[:-1]:
-        cv2.circle(frame, (target[0], target[1]), 5, YELLOW, -1)
-        
-    for target in targets_b[:-1]:
-        cv2.circle(frame, (target[0], target[1]), 5, PINK, -1)
-
-    cv2.circle(frame, (helicopters[0][0], helicopters[0][1]), 5, BLUE, -1)
-    cv2.circle(frame, (helicopters[1][0], helicopters[1][1]), 5, RED, -1)
+    cv2.putText(frame, "left click - target, right click - helicopter", (25, 50), FONT, SIZE, WHITE)
+    colors = Colors(len(helicopters))
+    for group, (_, target_color, _) in zip(SplitTargets(targets, helicopters), colors):
+        if group:
+            Disks(frame, np.array(group, dtype=np.int32), target_color)
+
+    for helicopter, (helicopter_color, _, _) in zip(helicopters, colors):
+        cv2.circle(frame, (helicopter[0], helicopter[1]), RADIUS, helicopter_color, -1)
+    cv2.imshow(WINDOW, frame)
+
+def Snapshot(fleet, solutions, infos, pixels):
+    # copies of what Draw needs as the solver keeps changing its arrays, pixels are integer coordinates of the fleet
+    routes = [pixels[fleet.route(vehicle, solution)] for vehicle, solution in enumerate(solutions)]
+    targets = [pixels[fleet.indices(vehicle)[:-1]] for vehicle in range(len(solutions))]
+    return routes, targets, pixels[fleet.size:], infos
+
+def Draw(frame, snapshot, colors):
+    # draw simulation into a preallocated frame
+    routes, targets, helicopters, infos = snapshot
+    frame.fill(0)
+    for route, (_, _, route_color) in zip(routes, colors):
+        cv2.polylines(frame, [route.reshape(-1, 1, 2)], True, route_color, 2)
+    for group, (_, target_color, _) in zip(targets, colors):
+        Disks(frame, group, target_color)
+
+    for helicopter, (helicopter_color, _, _) in zip(helicopters, colors):
+        cv2.circle(frame, (int(helicopter[0]), int(helicopter[1])), RADIUS, helicopter_color, -1)
 
     cv2.putText(frame, f"Temperature ", (25, 50), FONT, SIZE, RED)
     cv2.putText(frame, f"Score ", (25, 75), FONT, SIZE, RED)
@@ -116,95 +135,213 @@ def Draw(width, height, targets_a, targets_b, helicopters, solution_a, solution_
     cv2.putText(frame, f"Worst Score ", (25, 125), FONT, SIZE, RED)
     cv2.putText(frame, f"# Targets ", (25, 150), FONT, SIZE, RED)
 
+    # annealed routes
     cv2.putText(frame, f" {infos[0]:.2f}", (175, 50), FONT, SIZE, GREEN)
     cv2.putText(frame, f" {infos[1]:.2f}", (175, 75), FONT, SIZE, GREEN)
     cv2.putText(frame, f" {infos[2]:.2f}", (175, 100), FONT, SIZE, GREEN)
     cv2.putText(frame, f" {infos[3]:.2f}", (175, 125), FONT, SIZE, GREEN)
-    cv2.putText(frame, f" {len(targets_a)-1}", (175, 150), FONT, SIZE, GREEN)
-
-    cv2.putText(frame, f" {infos[0]:.2f}", (300, 50), FONT, SIZE, WHITE)
-    cv2.putText(frame, f" {infos[4]:.2f}", (300, 75), FONT, SIZE, WHITE)
-    cv2.putText(frame, f" {infos[5]:.2f}", (300, 100), FONT, SIZE, WHITE)
-    cv2.putText(frame, f" {infos[6]:.2f}", (300, 125), FONT, SIZE, WHITE)
-    cv2.putText(frame, f" {len(targets_b)-1}", (300, 150), FONT, SIZE, WHITE)
-
-    cv2.putText(frame, f" {infos[7]:.2f}", (500, 50), FONT, SIZE, BLUE)
-    cv2.putText(frame, f" {infos[8]:.2f}", (500, 75), FONT, SIZE, BLUE)
-    cv2.putText(frame, f" {infos[9]:.2f}", (500, 100), FONT, SIZE, BLUE)
-    cv2.putText(frame, f" {infos[10]:.2f}", (500, 125), FONT, SIZE, BLUE)
-
-    cv2.imshow("Simulated Annealing", frame)
-    cv2.waitKey(5)
-
-def FindBestRoutes(targets_a, targets_b, helicopters, current_score, best_score, worst_score, g_temperature):
-    # find best routes for given targets
-    targets_touple = ()
-    sorted_touples = sorted(targets_a, key=lambda x: x[0])
-    for touple in sorted_touples: 
-        targets_touple += touple
-    # check for routes that has already been optimized    
-    if targets_touple in BEST_ROUTES:
-        best_score_ab, trg_a, trg_b = BEST_ROUTES[targets_touple]
-        current_solution_a = [targets_a.index(target) for target in trg_a]
-        current_solution_b = [targets_b.index(target) for target in trg_b]
-        infos = (INITIAL_TEMPERATURE, 0, 0, 0, 0, 0, 0, g_temperature, current_score, best_score, worst_score)
-        Draw(WIDTH, HEIGHT, targets_a, targets_b, helicopters, current_solution_a, current_solution_b, infos)
-        return (best_score_ab, current_solution_a, current_solution_b)
-    
-    current_solution_a = Initialize(len(targets_a))
-    current_score_a = Evaluate(targets_a, current_solution_a)
-    best_score_a = worst_score_a = current_score_a
-
-    current_solution_b = Initialize(len(targets_b))
-    current_score_b = Evaluate(targets_b, current_solution_b)
-    best_score_b = worst_score_b = current_score_b
-
-    temperature = INITIAL_TEMPERATURE
-    while (temperature > STOPPING_TEMPERATURE):
-        new_solution_a = Modify(current_solution_a)
-        new_score_a = Evaluate(targets_a, new_solution_a)
-        best_score_a = min(best_score_a, new_score_a)
-        worst_score_a = max(worst_score_a, new_score_a)
-        if new_score_a < current_score_a:
-            current_solution_a = new_solution_a
-            current_score_a = new_score_a
+    cv2.putText(frame, f" {sum(len(group) for group in targets)}", (175, 150), FONT, SIZE, GREEN)
+
+    # assignment of targets to helicopters
+    cv2.putText(frame, f" {infos[4]:.2f}", (350, 50), FONT, SIZE, BLUE)
+    cv2.putText(frame, f" {infos[5]:.2f}", (350, 75), FONT, SIZE, BLUE)
+    cv2.putText(frame, f" {infos[6]:.2f}", (350, 100), FONT, SIZE, BLUE)
+    cv2.putText(frame, f" {infos[7]:.2f}", (350, 125), FONT, SIZE, BLUE)
+
+class DrawObserver:
+    # publishes snapshots of the annealing to a mailbox, every n-th snapshot and at most once per interval milliseconds
+    # nothing is copied while the renderer has not taken the previous snapshot, so the solver never waits for it
+    def __init__(self, mailbox, every=1, interval=0):
+        self.mailbox = mailbox
+        self.every = max(1, every)
+        self.interval = interval
+        self.calls = 0
+        self.last = -np.inf
+        self.fleet = None
+
+    def __call__(self, fleet, solutions, infos, force=False):
+        self.calls += 1
+        now = time.perf_counter()
+        if not force and (self.calls % self.every or (now - self.last) * 1000 < self.interval or self.mailbox.pending):
+            return
+        self.last = now
+        if fleet is not self.fleet:
+            self.fleet = fleet
+            self.pixels = fleet.coordinates.astype(np.int32)
+        self.mailbox.publish(Snapshot(fleet, solutions, infos, self.pixels))
+
+class FrameRenderer:
+    # shows snapshots in the window, all of them drawn into one preallocated frame
+    def __init__(self, width=None, height=None):
+        self.frame = np.zeros((height or HEIGHT, width or WIDTH, 3), dtype=np.uint8)
+        self.colors = []
+
+    def __call__(self, snapshot):
+        if len(self.colors) != len(snapshot[2]):
+            self.colors = Colors(len(snapshot[2]))
+        Draw(self.frame, snapshot, self.colors)
+        cv2.imshow(WINDOW, self.frame)
+
+def Show(future, mailbox, renderer):
+    # render snapshots of a solver running in another thread until it finishes, the window stays responsive
+    while not future.done() or mailbox.pending:
+        snapshot = mailbox.take(RENDER_WAIT)
+        if snapshot is not None:
+            renderer(snapshot)
+        cv2.waitKey(1)
+    return future.result()
+
+def Phase(tracer, name, event=True, **args):
+    # timed block of the tracer, nothing without one
+    if tracer is None:
+        return nullcontext()
+    return tracer.phase(name, event, **args)
+
+def Canonical(coordinates):
+    # order of points sorted by coordinates, it does not depend on how the points are numbered
+    return np.lexsort((coordinates[:, 1], coordinates[:, 0]))
+
+def FindBestRoutes(fleet, solutions, vehicles, current_score, best_score, worst_score, g_temperature, observer=None, schedule=None, cache=None, tracer=None, rng=None, seeder=None):
+    # find best routes of given vehicles, solutions of these vehicles are replaced in place and their scores returned
+    # routes of the other vehicles are kept and only shown to the observer
+    # schedule cools every annealing of routes, tracer collects cache hits, iteration counts and acceptance ratios
+    # annealing starts from tours built by seeder, random ones without it
+    return Finish(FindingBestRoutes(fleet, solutions, vehicles, current_score, best_score, worst_score, g_temperature, observer, schedule, cache, tracer, rng, seeder))
+
+def FindingBestRoutes(fleet, solutions, vehicles, current_score, best_score, worst_score, g_temperature, observer=None, schedule=None, cache=None, tracer=None, rng=None, seeder=None, stop=None, clock=time.perf_counter):
+    # FindBestRoutes as generator of improving (score, routes, elapsed seconds), score summed over the vehicles and routes as point indices
+    # stop is asked after every annealing block, once it is true the annealing ends and its routes are not cached
+    # returns the scores FindBestRoutes returns
+    started = clock()
+    if schedule is None:
+        schedule = Geometric(INITIAL_TEMPERATURE, STOPPING_TEMPERATURE, TEMPERATURE_DECAY)
+    if cache is None:
+        cache = ROUTE_CACHE
+    scores = {}
+    missing = []
+    for vehicle in vehicles:
+        coordinates = fleet.coordinates[fleet.indices(vehicle)]
+        canonical = Canonical(coordinates)
+        # cached routes are stored as positions in canonical order
+        key = cache.key(coordinates[canonical], fleet.depots[vehicle])
+        # check for routes that has already been optimized    
+        cached = cache.get(key)
+        if tracer is not None:
+            tracer.count("cache_hit" if cached is not None else "cache_miss")
+        if cached is not None:
+            scores[vehicle], route = cached
+            solutions[vehicle] = canonical[route]
         else:
-            delta = new_score_a - current_score_a
-            probability = np.exp(-delta / temperature)
-            if probability > np.random.uniform():
-                current_solution_a = new_solution_a
-                current_score_a = new_score_a
-
-        new_solution_b = Modify(current_solution_b)
-        new_score_b = Evaluate(targets_b, new_solution_b)
-        best_score_b = min(best_score_b, new_score_b)
-        worst_score_b = max(worst_score_b, new_score_b)
-        if new_score_b < current_score_b:
-            current_solution_b = new_solution_b
-            current_score_b = new_score_b
+            missing.append((vehicle, coordinates, canonical, key))
+    if missing:
+        cached_score = sum(scores.values())
+        annealing = AnnealingRoutes(fleet, solutions, [(vehicle, coordinates) for vehicle, coordinates, _, _ in missing], current_score, best_score, worst_score, g_temperature, observer, schedule, tracer, rng, seeder, stop)
+        with Phase(tracer, "anneal", routes=len(missing), targets=sum(len(coordinates) - 1 for _, coordinates, _, _ in missing)):
+            while True:
+                try:
+                    score = cached_score + next(annealing)
+                except StopIteration as finished:
+                    annealed, stopped = finished.value
+                    break
+                yield score, [fleet.route(vehicle, solutions[vehicle]) for vehicle in vehicles], clock() - started
+        scores.update(annealed)
+        if not stopped:
+            for vehicle, _, canonical, key in missing:
+                ranks = np.empty_like(canonical)
+                ranks[canonical] = np.arange(len(canonical))
+                cache.put(key, scores[vehicle], ranks[solutions[vehicle]])
+    else:
+        if observer is not None:
+            infos = (schedule.initial or 0, 0, 0, 0, g_temperature, current_score, best_score, worst_score)
+            observer(fleet, solutions, infos)
+        yield sum(scores.values()), [fleet.route(vehicle, solutions[vehicle]) for vehicle in vehicles], clock() - started
+    return [scores[vehicle] for vehicle in vehicles]
+
+def AnnealingRoutes(fleet, solutions, routes, current_score, best_score, worst_score, g_temperature, observer, schedule, tracer=None, rng=None, seeder=None, stop=None):
+    # anneal routes side by side, routes are pairs of vehicle and coordinates of its points
+    # generator of the summed best scores of routes, at the start and after every block finding a new best
+    # solutions hold the best orders found for every route, stop is asked after every block
+    # returns best scores of the vehicles and whether stop ended the annealing
+    tours = [Route(coordinates, rng, seeder) for _, coordinates in routes]
+    scores = [Evaluate(tour.store, tour.order) for tour in tours]
+    best_scores = list(scores)
+    for (vehicle, _), tour in zip(routes, tours):
+        solutions[vehicle] = tour.order.copy()
+    best_score_routes = worst_score_routes = sum(scores)
+    yield best_score_routes
+
+    # blocks of iterations run in the kernel, the schedule and the observer see their ends
+    temperature = schedule.start().temperature
+    stopped = False
+    while schedule.running():
+        temperatures = schedule.block(BLOCK)
+        for k, tour in enumerate(tours):
+            scores[k], flags = kernels.anneal(tour, scores[k], temperatures, rng)
+            if tracer is not None:
+                tracer.acceptances("inner", temperatures, flags)
+        if tracer is not None:
+            tracer.count("inner_iterations", len(tours) * len(temperatures))
+        for k, ((vehicle, _), tour) in enumerate(zip(routes, tours)):
+            if scores[k] < best_scores[k]:
+                best_scores[k] = scores[k]
+                solutions[vehicle] = tour.order.copy()
+        score_routes = sum(scores)
+        improved = sum(best_scores) < best_score_routes
+        best_score_routes = min(best_score_routes, sum(best_scores))
+        worst_score_routes = max(worst_score_routes, score_routes)
+
+        temperature = schedule.advance(len(temperatures), score_routes)
+        if observer is not None:
+            infos = (temperature, score_routes, best_score_routes, worst_score_routes, g_temperature, current_score, best_score, worst_score)
+            observer(fleet, solutions, infos)
+        if improved:
+            yield best_score_routes
+        if stop is not None and stop():
+            stopped = True
+            break
+    return {vehicle: score for (vehicle, _), score in zip(routes, best_scores)}, stopped
+
+def ParallelRoutes(fleet, solutions, vehicles, chains, schedule, rng=None, iterations=None, tempering=False):
+    # anneal routes of vehicles with parallel.multi_start, or parallel.parallel_tempering with a ladder between the temperatures
+    # of schedule, chains of a route start from its solution and the best route found is kept, returns scores of the routes
+    scores = []
+    for vehicle in vehicles:
+        points = fleet.coordinates[fleet.indices(vehicle)]
+        if len(points) < 4:
+            scores.append(Evaluate(PointStore(points), solutions[vehicle]))
+            continue
+        seed = int(Random(rng).integers(2**63))
+        if tempering:
+            rounds = math.ceil(iterations / parallel.SWEEP) if iterations else None
+            score, solutions[vehicle], _ = parallel.parallel_tempering(points, chains, rounds, seed=seed, low=schedule.stopping, high=schedule.initial, start=solutions[vehicle])
         else:
-            delta = new_score_b - current_score_b
-            probability = np.exp(-delta / temperature)
-            if probability > np.random.uniform():
-                current_solution_b = new_solution_b
-                current_score_b = new_score_b
-
-        temperature *= TEMPERATURE_DECAY
-        infos = (temperature, current_score_a, best_score_a, worst_score_a, current_score_b, best_score_b, worst_score_b, g_temperature, current_score, best_score, worst_score)
-        Draw(WIDTH, HEIGHT, targets_a, targets_b, helicopters, current_solution_a, current_solution_b, infos)
-    BEST_ROUTES[targets_touple] = (best_score_a + best_score_b, [targets_a[i] for i in current_solution_a], [targets_b[i] for i in current_solution_b])   
-    return (best_score_a + best_score_b, current_solution_a, current_solution_b)    
-
-BEST_ROUTES = {}
+            score, solutions[vehicle], _ = parallel.multi_start(points, chains, seed, initial_temperature=schedule.initial, stopping_temperature=schedule.stopping, iterations=iterations, start=solutions[vehicle])
+        scores.append(score)
+    return scores
+
+def Finish(generator):
+    # run a generator to its end, returns its return value
+    while True:
+        try:
+            next(generator)
+        except StopIteration as finished:
+            return finished.value
+
+ROUTE_CACHE = RouteCache()
 WIDTH = 840
 HEIGHT = 680
 TARGET_COUNT = 10
-INITIAL_TEMPERATURE = 300
+SEEDER = "greedy"
 GENERAL_TEMPERATURE = 1000
-STOPPING_TEMPERATURE = 1
 TEMPERATURE_DECAY = 0.95
 GENERAL_TEMPERATURE_DECAY = 0.95
-FONT = cv2.FONT_HERSHEY_DUPLEX
+FINAL_TEMPERATURE_DECAY = 0.992
+FINAL_BUDGET_SHARE = 0.2
+REHEAT_PATIENCE = 20
+REASSIGN_CANDIDATES = 4
+BOUNDARY_FLOOR = 0.02
+COINCIDENCE = 1e-9
+FONT = cv2.FONT_HERSHEY_DUPLEX if cv2 is not None else None
 SIZE = 0.7
 WHITE = (255, 255, 255)
 GREEN = (0, 255, 0)
@@ -212,60 +349,275 @@ RED = (0, 0, 255)
 YELLOW = (0, 100, 255)
 BLUE = (255, 0, 0)
 PINK = (100, 0, 255)
+HUE_STEP = 47
+HUE_OFFSET = 20
+RADIUS = 5
+DISK_Y, DISK_X = np.nonzero(np.hypot(*np.mgrid[-RADIUS:RADIUS + 1, -RADIUS:RADIUS + 1]) <= RADIUS)
+DISK_Y -= RADIUS
+DISK_X -= RADIUS
+WINDOW = "Simulated Annealing"
+RENDER_WAIT = 0.02
 BUTTON_CLICKED = False
 
 # BLUE helicopter - YELLOW targets - GREEN routes
 # RED helicopter - PINK targets - WHITE routes
-
-def on_mouse_click(event, x, y, flags, param, button_x, button_y, button_height, button_width, helicopters, targets_a_general, targets_b_general):
+# further helicopters get colours spread over the hue circle
+
+def Steps(initial, stopping, decay):
+    # number of steps of geometric cooling from initial to stopping temperature
+    return max(1, math.ceil(math.log(stopping / initial) / math.log(decay)))
+
+def Schedules(name="geometric", budget=None, stagnation=None, reheat=None, auto=False, seeded=False):
+    # outer, route and final schedules of Solve, with a budget the outer and final annealing are timed and keep the chosen cooling rule
+    # lundy-mees cooling takes as many steps as the geometric one, automatic schedules get initial and stopping temperatures in Solve
+    # routes annealed from seeded tours get both temperatures estimated in Solve, the start at a low acceptance, so they start cooler
+    general = None if auto else GENERAL_TEMPERATURE
+    general_stopping = None if auto else STOPPING_TEMPERATURE
+    initial = None if auto or seeded else INITIAL_TEMPERATURE
+    stopping = None if auto or seeded else STOPPING_TEMPERATURE
+    options = dict(stagnation=stagnation, reheat=reheat, patience=REHEAT_PATIENCE)
+    if name == "lundy-mees":
+        outer_steps = Steps(GENERAL_TEMPERATURE, STOPPING_TEMPERATURE, GENERAL_TEMPERATURE_DECAY)
+        final_steps = Steps(INITIAL_TEMPERATURE, STOPPING_TEMPERATURE, FINAL_TEMPERATURE_DECAY)
+        outer = LundyMees(general, general_stopping, steps=outer_steps, **options)
+        route = LundyMees(initial, stopping, steps=Steps(INITIAL_TEMPERATURE, STOPPING_TEMPERATURE, TEMPERATURE_DECAY), stagnation=stagnation)
+        final = LundyMees(initial, stopping, steps=final_steps, stagnation=stagnation)
+        if budget is not None:
+            outer = TimedLundyMees(budget * (1 - FINAL_BUDGET_SHARE), general, general_stopping, steps=outer_steps, **options)
+            final = TimedLundyMees(budget * FINAL_BUDGET_SHARE, initial, stopping, steps=final_steps, stagnation=stagnation)
+    else:
+        outer = Geometric(general, general_stopping, GENERAL_TEMPERATURE_DECAY, **options)
+        route = Geometric(initial, stopping, TEMPERATURE_DECAY, stagnation=stagnation)
+        final = Geometric(initial, stopping, FINAL_TEMPERATURE_DECAY, stagnation=stagnation)
+        if budget is not None:
+            outer = Timed(budget * (1 - FINAL_BUDGET_SHARE), general, general_stopping, GENERAL_TEMPERATURE_DECAY, **options)
+            final = Timed(budget * FINAL_BUDGET_SHARE, initial, stopping, FINAL_TEMPERATURE_DECAY, stagnation=stagnation)
+    return outer, route, final
+
+def SaveState(fleet, solutions, scores, routes, best_owners, best_routes, weights, values, schedules, generators, uniforms, cache):
+    # arrays and meta data of a checkpoint of Solve taken between two outer iterations
+    # solutions and routes are saved with the lists of vehicles, which Solve continues from exactly
+    lists, lengths = checkpoints.pack(fleet.indices(vehicle) for vehicle in range(len(fleet.depots)))
+    arrays = {
+        "coordinates": fleet.coordinates.copy(),
+        "lists": lists,
+        "lengths": lengths,
+        "scores": np.array(scores, dtype=np.float64),
+        "best_owners": best_owners.copy(),
+        "uniforms": np.array(uniforms.values, dtype=np.float64),
+    }
+    arrays["solutions"], _ = checkpoints.pack(solutions)
+    arrays["routes"], _ = checkpoints.pack(routes)
+    arrays["best_routes"], arrays["best_lengths"] = checkpoints.pack(best_routes)
+    if weights is not None:
+        arrays["weights"], arrays["weight_tree"], total = weights.state()
+        values = dict(values, weight_total=total)
+    keys = list(cache.entries)
+    arrays["cache_scores"] = np.array([cache.entries[key][0] for key in keys], dtype=np.float64)
+    arrays["cache_routes"], arrays["cache_lengths"] = checkpoints.pack(cache.entries[key][1] for key in keys)
+    meta = {
+        "size": fleet.size,
+        "values": values,
+        "schedules": [schedule.state() for schedule in schedules],
+        "generators": [generator.bit_generator.state for generator in generators],
+        "cache_keys": keys,
+    }
+    return arrays, meta
+
+def LoadState(state, fleet, generators, uniforms, cache):
+    # restore a checkpoint of SaveState into a fleet over the same points, generators, uniforms and cache
+    # returns solutions, scores, routes, best owners, best routes, weights, saved scalar values and schedules
+    arrays, meta = state
+    fleet.load(checkpoints.unpack(arrays["lists"], arrays["lengths"]))
+    solutions = checkpoints.unpack(arrays["solutions"], arrays["lengths"])
+    routes = checkpoints.unpack(arrays["routes"], arrays["lengths"])
+    best_routes = checkpoints.unpack(arrays["best_routes"], arrays["best_lengths"])
+    values = meta["values"]
+    weights = None
+    if "weights" in arrays:
+        weights = WeightTree.restore(arrays["weights"], arrays["weight_tree"], values["weight_total"])
+    for generator, generator_state in zip(generators, meta["generators"]):
+        generator.bit_generator.state = generator_state
+    uniforms.values = arrays["uniforms"].tolist()
+    for key, score, route in zip(meta["cache_keys"], arrays["cache_scores"], checkpoints.unpack(arrays["cache_routes"], arrays["cache_lengths"])):
+        cache.remember(key, (float(score), route))
+    schedules = [Schedule.restore(schedule) for schedule in meta["schedules"]]
+    return solutions, arrays["scores"].copy(), routes, arrays["best_owners"], best_routes, weights, values, schedules
+
+def Solve(targets, helicopters, observer=None, cache=None, tracer=None, owners=None, schedules=None, rng=None, checkpoint=None, resume=None, seeder=None, chains=None, chain_iterations=None, tempering=False):
+    # two-level annealing - outer loop moves one target to another helicopter, FindBestRoutes re-optimizes the two routes it touched
+    # targets start assigned to the closest helicopter unless owners are given
+    # schedules are the outer, route and final schedule, missing initial temperatures are estimated from sampled moves
+    # rng is a generator or seed, the outer loop and the annealing of routes draw from independent streams of it
+    # checkpoint is a Checkpointer asked between outer iterations, resume a checkpoint read by checkpoint.read to continue from
+    # routes are annealed from tours built by seeder, one of seeders.SEEDERS, instead of random ones
+    # with chains the final annealing of every route runs that many chains of chain_iterations steps in parallel,
+    # replicas of parallel tempering with tempering
+    # returns best score, fleet with the best assignment and solutions of its vehicles
+    outer_rng, route_rng = streams(rng, 2)
+    uniforms = Uniforms(outer_rng)
+    if cache is None:
+        cache = ROUTE_CACHE
+    if tracer is not None:
+        observer = tracer.timed("draw", observer)
+    points = np.asarray(targets, dtype=np.float64).reshape(-1, 2)
+    # the closest helicopters of every target are the candidates for its reassignment
+    candidates = nearest_sites(points, helicopters, REASSIGN_CANDIDATES + 1)
+    fleet = Fleet(points, helicopters, candidates[:, 0] if owners is None else owners)
+    vehicles = range(len(fleet.depots))
+    movable = len(vehicles) > 1 and fleet.size > 0
+    weights = None
+    if resume is not None:
+        solutions, scores, routes, best_owners, best_routes, weights, values, schedules = LoadState(resume, fleet, (outer_rng, route_rng), uniforms, cache)
+        schedule, route_schedule, final_schedule = schedules
+        current_score, best_score, worst_score, g_temperature = (values[name] for name in ("current", "best", "worst", "temperature"))
+        seeder = values.get("seeder")
+    else:
+        schedule, route_schedule, final_schedule = [copy.copy(item) for item in schedules or Schedules()]
+        if route_schedule.initial is None or final_schedule.initial is None:
+            deltas = [delta for vehicle in vehicles for delta in SampleDeltas(Route(fleet.coordinates[fleet.indices(vehicle)], route_rng, seeder), TEMPERATURE_SAMPLES, route_rng, KERNEL_MOVES)]
+            # a seeded tour is already good, only a small share of uphill moves should pass at the start
+            temperature = initial_temperature(deltas, SEEDED_ACCEPTANCE if seeder is not None else INITIAL_ACCEPTANCE, INITIAL_TEMPERATURE)
+            # estimated stopping temperatures keep the ratio of the default schedule, so both follow the scale of the points
+            stopping = temperature * STOPPING_TEMPERATURE / INITIAL_TEMPERATURE
+            for item in (route_schedule, final_schedule):
+                item.initial = item.initial or temperature
+                item.stopping = item.stopping or stopping
+
+        g_temperature = schedule.initial or GENERAL_TEMPERATURE
+        solutions = [None] * len(vehicles)
+        scores = np.array(FindBestRoutes(fleet, solutions, vehicles, np.inf, np.inf, np.inf, g_temperature, observer, route_schedule, cache, tracer, route_rng, seeder))
+        current_score = best_score = worst_score = float(scores.sum())
+        # routes as point indices survive changes of the lists of vehicles
+        routes = [fleet.route(vehicle, solutions[vehicle]) for vehicle in vehicles]
+        best_owners = fleet.owners.copy()
+        best_routes = list(routes)
+        if movable:
+            # targets near the split between helicopters are moved more often
+            weights = WeightTree(BoundaryWeights(fleet, candidates, np.arange(fleet.size)))
+        if schedule.initial is None:
+            deltas = []
+            if movable:
+                deltas = [ReassignDelta(fleet, solutions, *ModifyTargets(fleet, candidates, weights, uniforms)) for _ in range(TEMPERATURE_SAMPLES)]
+            schedule.initial = initial_temperature(deltas, default=GENERAL_TEMPERATURE)
+            schedule.stopping = schedule.stopping or schedule.initial * STOPPING_TEMPERATURE / GENERAL_TEMPERATURE
+        g_temperature = schedule.start().temperature
+    while(schedule.running() and movable):
+        with Phase(tracer, "reassign", event=False):
+            target, source, destination = ModifyTargets(fleet, candidates, weights, uniforms)
+        record = fleet.move(target, destination)
+        previous_solutions = solutions[source], solutions[destination]
+
+        score_source, score_destination = FindBestRoutes(fleet, solutions, (source, destination), current_score, best_score, worst_score, g_temperature, observer, route_schedule, cache, tracer, route_rng, seeder)
+        new_score = current_score - scores[source] - scores[destination] + score_source + score_destination
+        if new_score < best_score:
+            best_score = new_score
+            best_owners = fleet.owners.copy()
+            best_routes = list(routes)
+            best_routes[source] = fleet.route(source, solutions[source])
+            best_routes[destination] = fleet.route(destination, solutions[destination])
+        worst_score = max(worst_score, new_score)
+        if new_score < current_score:
+            accepted = True
+        else:
+            delta = new_score - current_score
+            probability = np.exp(-delta / g_temperature)
+            accepted = probability > uniforms.random()
+        if accepted:
+            scores[source], scores[destination] = score_source, score_destination
+            routes[source] = fleet.route(source, solutions[source])
+            routes[destination] = fleet.route(destination, solutions[destination])
+            current_score = float(scores.sum())
+            weights.update(target, BoundaryWeights(fleet, candidates, [target])[0])
+        else:
+            fleet.undo(record)
+            solutions[source], solutions[destination] = previous_solutions
+        if tracer is not None:
+            tracer.count("outer_iterations")
+            tracer.acceptance("outer", g_temperature, accepted)
+            tracer.value("score", current=current_score, best=best_score)
+        g_temperature = schedule.step(current_score)
+        if checkpoint is not None and checkpoint.due():
+            values = {"current": current_score, "best": best_score, "worst": worst_score, "temperature": g_temperature, "seeder": seeder}
+            with Phase(tracer, "checkpoint"):
+                checkpoint.save(*SaveState(fleet, solutions, scores, routes, best_owners, best_routes, weights, values, (schedule, route_schedule, final_schedule), (outer_rng, route_rng), uniforms, cache))
+
+    # final slow annealing of the best assignment, bypassing the cache
+    fleet.assign(best_owners)
+    solutions = [fleet.solution(vehicle, route) for vehicle, route in zip(vehicles, best_routes)]
+    if chains is None:
+        best_score = float(sum(FindBestRoutes(fleet, solutions, vehicles, best_score, best_score, worst_score, g_temperature, observer, final_schedule, RouteCache(0), tracer, route_rng, seeder)))
+    else:
+        with Phase(tracer, "parallel"):
+            best_score = float(sum(ParallelRoutes(fleet, solutions, vehicles, chains, final_schedule, route_rng, chain_iterations, tempering)))
+    if observer is not None:
+        infos = (0, 0, 0, 0, g_temperature, 0, best_score, worst_score)
+        observer(fleet, solutions, infos, force=True)
+    return best_score, fleet, solutions
+
+def Resume(path, observer=None, cache=None, tracer=None, checkpoint=None, chains=None, chain_iterations=None, tempering=False):
+    # continue Solve from a checkpoint file with the points, schedules and random streams saved in it
+    state = checkpoints.read(path)
+    arrays, meta = state
+    coordinates = arrays["coordinates"]
+    return Solve(coordinates[:meta["size"]], coordinates[meta["size"]:], observer, cache, tracer, checkpoint=checkpoint, resume=state, chains=chains, chain_iterations=chain_iterations, tempering=tempering)
+
+def RouteFromSolution(fleet, vehicle, solution):
+    # point indices of a route starting at the helicopter
+    route = fleet.route(vehicle, solution)
+    return np.roll(route, -np.flatnonzero(route == fleet.size + vehicle)[0])
+
+def Results(fleet, solutions):
+    # json serializable description of found routes
+    store = PointStore(fleet.coordinates)
+    routes = []
+    for vehicle, solution in enumerate(solutions):
+        route = RouteFromSolution(fleet, vehicle, solution)
+        routes.append({
+            "helicopter": fleet.depots[vehicle].tolist(),
+            "route": fleet.coordinates[route].tolist(),
+            "length": Evaluate(store, route),
+        })
+    return {"score": sum(route["length"] for route in routes), "routes": routes}
+
+def on_mouse_click(event, x, y, flags, param, button_x, button_y, button_height, button_width, helicopters, targets):
+    # left click places a target, or the first helicopter, right click places another helicopter
     global BUTTON_CLICKED
-    if not BUTTON_CLICKED and event == cv2.EVENT_LBUTTONDOWN:
-        if button_x < x < button_x + button_width and button_y < y < button_y + button_height and len(helicopters) == 2 and len(targets_a_general) + len(targets_b_general) > 0:
+    if not BUTTON_CLICKED and event in (cv2.EVENT_LBUTTONDOWN, cv2.EVENT_RBUTTONDOWN):
+        if event == cv2.EVENT_LBUTTONDOWN and button_x < x < button_x + button_width and button_y < y < button_y + button_height and len(helicopters) > 0 and len(targets) > 0:
             BUTTON_CLICKED = not BUTTON_CLICKED
             print("Button clicked!")
-        elif 160 < y < HEIGHT - 5:
-            if len(helicopters) < 2:
+        elif 160 < y < HEIGHT - 5 and (x,y) not in targets and (x,y) not in helicopters:
+            if event == cv2.EVENT_RBUTTONDOWN or len(helicopters) == 0:
                 helicopters.append((x,y))
-            elif (x,y) not in targets_a_general and (x,y) not in targets_b_general:
-                if get_distance((x,y), helicopters[0]) < get_distance((x,y), helicopters[1]):
-                    targets_a_general.append((x,y))
-                else:
-                    targets_b_general.append((x,y))  
-
-def main():
-    cv2.namedWindow("Simulated Annealing")
+            else:
+                targets.append((x,y))
+
+def Interactive():
+    # place helicopters and targets by mouse clicks and watch the annealing
+    cv2.namedWindow(WINDOW)
     button_x, button_y, button_width, button_height = WIDTH-110, 50, 100, 40
-    cv2.setMouseCallback("Simulated Annealing", lambda event, x, y, flags, param: on_mouse_click(event, x, y, flags, param, button_x, button_y, button_height, button_width, helicopters, targets_a_general, targets_b_general))
+    cv2.setMouseCallback(WINDOW, lambda event, x, y, flags, param: on_mouse_click(event, x, y, flags, param, button_x, button_y, button_height, button_width, helicopters, targets))
 
-    frame = np.zeros((HEIGHT, WIDTH, 3), dtype=np.uint8)
+    renderer = FrameRenderer()
     # custom targets and helicopters
-    targets_a_general = []
-    targets_b_general = []
+    targets = []
     helicopters = []
     
     while True:
-        cv2.rectangle(frame, (button_x, button_y), (button_x + button_width, button_y + button_height), WHITE, -1)
-        cv2.putText(frame, "RUN", (button_x + 10, button_y + 30), FONT, SIZE, GREEN)
-
-        cv2.imshow("Simulated Annealing", frame)
-        if len(helicopters) > 0:
-            DrawPoints(WIDTH, HEIGHT, targets_a_general, targets_b_general, helicopters, button_x, button_y, button_height, button_width)   
+        DrawPoints(renderer.frame, targets, helicopters, button_x, button_y, button_height, button_width)
         if cv2.waitKey(5) and BUTTON_CLICKED:
             break
 
 
     # fixed targets
-    # all_targets = [
+    # targets = [
     #     (160, 390), (170, 410), (200, 500), (250, 382), (388, 400), (410, 440), (255, 387), (246, 399), 
     #     (188, 312), (417, 255), (562, 365), (650, 480), (413, 340), (700, 340)
     # ]
 
     # random targets
-    # targets_a_general = Generate(WIDTH, HEIGHT, TARGET_COUNT)
-    # targets_b_general = Generate(WIDTH, HEIGHT, TARGET_COUNT)
-
-    # random targets
-    # all_targets = Generate(WIDTH, HEIGHT, 2*TARGET_COUNT)
+    # targets = Generate(WIDTH, HEIGHT, 2*TARGET_COUNT)
 
     # randomly placed helicopters
     # helicopters = Generate(WIDTH, HEIGHT, 2)
@@ -273,65 +625,99 @@ def main():
     # fixed placement of helicopters
     # helicopters = [(110, 440), (730, 440)]
 
-    # closest targets to each helicopter
-    # all_targets = Generate(WIDTH, HEIGHT, 2*TARGET_COUNT)
-    # targets_a_general = []
-    # targets_b_general = []
-    # for target in all_targets:
-    #     if get_distance(target, helicopters[0]) < get_distance(target, helicopters[1]):
-    #         targets_a_general.append(target)
-    #         continue
-    #     targets_b_general.append(target)
-    
-    current_score = np.inf
-    best_score = worst_score = current_score
-    
-    g_temperature = GENERAL_TEMPERATURE
-
-    best_targets_a = []
-    best_targets_b = []
-    best_solution_a = []
-    best_solution_b = []
-    first_iteration = True
-    while(g_temperature > STOPPING_TEMPERATURE):
-        if first_iteration:
-            targets_a, targets_b = targets_a_general, targets_b_general
-            first_iteration = False
-        else:    
-            targets_a, targets_b = ModifyTargets(targets_a_general, targets_b_general, helicopters)
-        targets_a.append(helicopters[0])
-        targets_b.append(helicopters[1])
-
-        new_score, new_solution_a, new_solution_b = FindBestRoutes(targets_a, targets_b, helicopters, current_score, best_score, worst_score, g_temperature)
-        if new_score < best_score:
-            best_score = new_score
-            best_targets_a = targets_a
-            best_targets_b = targets_b
-            best_solution_a = new_solution_a
-            best_solution_b = new_solution_b
-        if worst_score == np.inf:
-            worst_score = new_score
-        worst_score = max(worst_score, new_score)
-        if new_score < current_score:
-            targets_a_general = targets_a[:-1]
-            targets_b_general = targets_b[:-1]
-            current_score = new_score
-        else:
-            delta = new_score - current_score
-            probability = np.exp(-delta / g_temperature)
-            if probability > np.random.uniform():
-                targets_a_general = targets_a[:-1]
-                targets_b_general = targets_b[:-1]
-                current_score = new_score
-        g_temperature *= GENERAL_TEMPERATURE_DECAY
-
-    global TEMPERATURE_DECAY, BEST_ROUTES
-    TEMPERATURE_DECAY = 0.992
-    BEST_ROUTES = {}
-    best_score, best_solution_a, best_solution_b = FindBestRoutes(best_targets_a, best_targets_b, helicopters, best_score, best_score, worst_score, g_temperature)    
-    infos = (0, 0, 0, 0, 0, 0, 0, g_temperature, 0, best_score, worst_score)    
-    Draw(WIDTH, HEIGHT, best_targets_a, best_targets_b, helicopters, best_solution_a, best_solution_b, infos)    
+    mailbox = Mailbox()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        Show(executor.submit(Solve, targets, helicopters, DrawObserver(mailbox), schedules=Schedules(seeded=True), seeder=SEEDER), mailbox, renderer)
     cv2.waitKey(0) 
 
+def ParsePoints(values):
+    # points given as "x,y" strings
+    return [tuple(float(coordinate) for coordinate in value.split(",")) for value in values]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Route helicopters over targets with simulated annealing.")
+    parser.add_argument("--input", help="JSON file with 'helicopters' and 'targets' lists of [x, y]")
+    parser.add_argument("--helicopters", nargs="+", metavar="X,Y", help="helicopter positions")
+    parser.add_argument("--targets", nargs="+", metavar="X,Y", help="target positions")
+    parser.add_argument("--targets-file", metavar="PATH", help="targets from a .npy, raw float32 (.f32), csv, txt or TSPLIB file, binary files are memory-mapped")
+    parser.add_argument("--output", help="write routes and scores as JSON to this file instead of stdout")
+    parser.add_argument("--draw-every", type=int, default=0, metavar="N", help="render every N-th snapshot, 0 disables rendering")
+    parser.add_argument("--draw-interval", type=float, default=0, metavar="MS", help="render at most once per MS milliseconds")
+    parser.add_argument("--cache", metavar="PATH", help="sqlite file persisting optimized routes between runs")
+    parser.add_argument("--cache-size", type=int, default=MAX_SIZE, help="number of routes kept in memory")
+    parser.add_argument("--trace", metavar="PATH", help="write counters, timings and acceptance ratios to this file")
+    parser.add_argument("--trace-format", choices=("jsonl", "chrome"), default="jsonl")
+    parser.add_argument("--schedule", choices=("geometric", "lundy-mees"), default="geometric", help="cooling rule of both annealing levels")
+    parser.add_argument("--budget", type=float, metavar="SECONDS", help="wall clock budget, the cooling is fitted to it")
+    parser.add_argument("--stagnation", type=int, metavar="N", help="stop annealing after N steps without a new best score")
+    parser.add_argument("--reheat", type=float, metavar="FACTOR", help=f"multiply the outer temperature by FACTOR after {REHEAT_PATIENCE} steps without a new best score")
+    parser.add_argument("--auto-temperature", action="store_true", help="estimate initial and stopping temperatures from sampled moves")
+    parser.add_argument("--seeder", choices=("random",) + tuple(seeders.SEEDERS), default=SEEDER, help="construction of the tours route annealing starts from, seeded tours start at a lower temperature")
+    parser.add_argument("--seed", type=int, help="seed of the random streams, runs with equal seeds and options are identical")
+    parser.add_argument("--checkpoint", metavar="PATH", help="periodically save the state of the run to this file")
+    parser.add_argument("--checkpoint-interval", type=float, default=checkpoints.INTERVAL, metavar="SECONDS", help="seconds between checkpoints")
+    parser.add_argument("--resume", metavar="PATH", help="continue the run saved in this checkpoint, points, schedules and seed are taken from it")
+    parser.add_argument("--chains", type=int, metavar="K", help="anneal every route of the final pass with K independent chains over all cores and keep the best")
+    parser.add_argument("--chain-iterations", type=int, metavar="N", help=f"steps of every chain, {parallel.CHAIN_ITERATIONS} per point of the route by default")
+    parser.add_argument("--tempering", action="store_true", help="run the chains as replicas of parallel tempering that exchange routes")
+    args = parser.parse_args(argv)
+    if args.tempering and args.chains is None:
+        parser.error("--tempering needs --chains")
+
+    interactive = args.input is None and args.targets is None and args.targets_file is None and args.resume is None
+    # windows are drawn with opencv, which is optional
+    if cv2 is None and (interactive or args.draw_every > 0):
+        parser.error("drawing needs OpenCV (pip install opencv-python), give targets and run without --draw-every to solve without it")
+    if interactive:
+        Interactive()
+        return
+
+    helicopters, targets = [], []
+    if args.input is not None:
+        with open(args.input) as file:
+            problem = json.load(file)
+        helicopters = np.asarray(problem["helicopters"], dtype=np.float64).reshape(-1, 2)
+        targets = np.asarray(problem["targets"], dtype=np.float64).reshape(-1, 2)
+    if args.helicopters is not None:
+        helicopters = ParsePoints(args.helicopters)
+    if args.targets is not None:
+        targets = ParsePoints(args.targets)
+    if args.targets_file is not None:
+        targets = loaders.load(args.targets_file)
+    if args.resume is None and len(helicopters) == 0:
+        parser.error("at least one helicopter is required")
+    if args.resume is None and len(targets) == 0:
+        parser.error("at least one target is required")
+
+    cache = RouteCache(args.cache_size, args.cache)
+    tracer = Tracer() if args.trace is not None else None
+    seeder = None if args.seeder == "random" else args.seeder
+    schedules = Schedules(args.schedule, args.budget, args.stagnation, args.reheat, args.auto_temperature, seeder is not None)
+    checkpoint = checkpoints.Checkpointer(args.checkpoint, args.checkpoint_interval) if args.checkpoint is not None else None
+    if args.resume is not None:
+        solve = lambda observer: Resume(args.resume, observer, cache, tracer, checkpoint, args.chains, args.chain_iterations, args.tempering)
+    else:
+        solve = lambda observer: Solve(targets, helicopters, observer, cache, tracer, schedules=schedules, rng=args.seed, checkpoint=checkpoint, seeder=seeder, chains=args.chains, chain_iterations=args.chain_iterations, tempering=args.tempering)
+    if args.draw_every > 0:
+        # the solver runs in a worker thread, this one renders
+        mailbox = Mailbox()
+        observer = DrawObserver(mailbox, args.draw_every, args.draw_interval)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            solved = Show(executor.submit(solve, observer), mailbox, FrameRenderer())
+    else:
+        solved = solve(None)
+    results = Results(*solved[1:])
+    cache.close()
+    if checkpoint is not None:
+        checkpoint.close()
+    if tracer is not None:
+        tracer.write(args.trace, args.trace_format)
+    if args.output is None:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
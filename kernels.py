@@ -0,0 +1,160 @@
+import math
+import numpy as np
+from moves import OR_OPT_LENGTH, OrOptMove, TwoOptMove
+from sampling import Uniforms
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+TWO_OPT_SHARE = 0.5
+RANDOMS = 5
+NOT_PROPOSED = -1
+REJECTED = 0
+ACCEPTED = 1
+
+# blocks of annealing steps with 2-opt and or-opt moves on a tour, one step per temperature
+# random numbers of a block are drawn at once, row i holds the operator choice, two draws of the move and the acceptance draw
+# compiled with numba when it is installed, otherwise steps are proposed and applied one at a time by the operators of moves.py
+
+def _distance(points, i, j):
+    return math.hypot(points[i, 0] - points[j, 0], points[i, 1] - points[j, 1])
+
+def _candidate(neighbours, count, point, random):
+    # random near point, any other point without neighbour lists
+    width = neighbours.shape[1]
+    if width > 0:
+        return neighbours[point, int(random * width)]
+    other = int(random * (count - 1))
+    return other + (other >= point)
+
+def _reverse(order, position, start, end):
+    # reverse positions start..end, the shorter of the segment and its complement is reversed
+    count = len(order)
+    length = (end - start) % count + 1
+    if 2 * length > count:
+        start = (end + 1) % count
+        length = count - length
+    for k in range(length // 2):
+        i = (start + k) % count
+        j = (start + length - 1 - k) % count
+        first = order[i]
+        second = order[j]
+        order[i] = second
+        order[j] = first
+        position[second] = i
+        position[first] = j
+
+def _relocate(order, position, buffer, start, length, offset, reverse):
+    # move segment of length points at start behind the point offset positions after start, like OrOptMove.apply
+    count = len(order)
+    for k in range(length):
+        buffer[k] = order[(start + (length - 1 - k if reverse else k)) % count]
+    if offset + 1 <= count - offset - 1 + length:
+        # points between segment and c move back, segment follows c
+        moved = offset + 1 - length
+        for k in range(moved):
+            point = order[(start + length + k) % count]
+            order[(start + k) % count] = point
+            position[point] = (start + k) % count
+        for k in range(length):
+            order[(start + moved + k) % count] = buffer[k]
+            position[buffer[k]] = (start + moved + k) % count
+    else:
+        # points after c move forward, segment precedes them
+        moved = count - offset - 1
+        base = start + offset + 1
+        for k in range(moved):
+            buffer[length + k] = order[(base + k) % count]
+        for k in range(length + moved):
+            order[(base + k) % count] = buffer[k]
+            position[buffer[k]] = (base + k) % count
+
+def _anneal(points, neighbours, order, position, buffer, temperatures, randoms, flags, score, max_length):
+    count = len(order)
+    for step in range(len(temperatures)):
+        random = randoms[step]
+        flags[step] = NOT_PROPOSED
+        if random[0] < TWO_OPT_SHARE:
+            a = order[int(random[1] * count)]
+            b = _candidate(neighbours, count, a, random[2])
+            successor_a = order[(position[a] + 1) % count]
+            successor_b = order[(position[b] + 1) % count]
+            if b == successor_a or a == successor_b:
+                continue
+            delta = _distance(points, a, b) + _distance(points, successor_a, successor_b) - _distance(points, a, successor_a) - _distance(points, b, successor_b)
+            if delta < 0 or math.exp(-delta / temperatures[step]) > random[3]:
+                _reverse(order, position, position[successor_a], position[b])
+                score += delta
+                flags[step] = ACCEPTED
+            else:
+                flags[step] = REJECTED
+        else:
+            length = 1 + int(random[1] * max_length)
+            if count - length < 3:
+                continue
+            start = int(random[2] * count)
+            first = order[start]
+            last = order[(start + length - 1) % count]
+            c = _candidate(neighbours, count, first, random[3])
+            offset = (position[c] - start) % count
+            if offset < length or offset == count - 1:
+                continue
+            previous = order[(start - 1) % count]
+            following = order[(start + length) % count]
+            successor_c = order[(position[c] + 1) % count]
+            removed = _distance(points, previous, following) - _distance(points, previous, first) - _distance(points, last, following) - _distance(points, c, successor_c)
+            forward = _distance(points, c, first) + _distance(points, last, successor_c)
+            backward = _distance(points, c, last) + _distance(points, first, successor_c)
+            delta = removed + min(forward, backward)
+            if delta < 0 or math.exp(-delta / temperatures[step]) > random[4]:
+                _relocate(order, position, buffer, start, length, offset, backward < forward)
+                score += delta
+                flags[step] = ACCEPTED
+            else:
+                flags[step] = REJECTED
+    return score
+
+if njit is not None:
+    _distance = njit(cache=True)(_distance)
+    _candidate = njit(cache=True)(_candidate)
+    _reverse = njit(cache=True)(_reverse)
+    _relocate = njit(cache=True)(_relocate)
+    _anneal = njit(cache=True)(_anneal)
+
+COMPILED = njit is not None
+
+def anneal(tour, score, temperatures, rng=None, max_length=OR_OPT_LENGTH):
+    # one annealing step per temperature on tour in place, returns new score and flags of steps
+    temperatures = np.asarray(temperatures, dtype=np.float64)
+    flags = np.full(len(temperatures), NOT_PROPOSED, dtype=np.int8)
+    count = len(tour)
+    if count < 4:
+        return score, flags
+    if COMPILED:
+        randoms = (np.random if rng is None else rng).random((len(temperatures), RANDOMS))
+        neighbours = tour.neighbours if tour.neighbours is not None else np.empty((count, 0), dtype=np.intp)
+        buffer = np.empty(count + max_length, dtype=tour.order.dtype)
+        score = _anneal(tour.store.points, neighbours, tour.order, tour.position, buffer, temperatures, randoms, flags, score, max_length)
+        return score, flags
+
+    # single steps with the operators of moves.py, like helicopters.AnnealStep with its kernel moves
+    # a step draws at most RANDOMS numbers, so those of a block are drawn at once
+    uniforms = Uniforms(np.random if rng is None else rng, RANDOMS * len(temperatures))
+    or_opt = OR_OPT if max_length == OR_OPT_LENGTH else OrOptMove(max_length)
+    for step, temperature in enumerate(temperatures.tolist()):
+        operator = TWO_OPT if uniforms.random() < TWO_OPT_SHARE else or_opt
+        move = operator.propose(tour, uniforms)
+        if move is None:
+            continue
+        delta = operator.delta(tour, move)
+        if delta < 0 or math.exp(-delta / temperature) > uniforms.random():
+            operator.apply(tour, move)
+            score += delta
+            flags[step] = ACCEPTED
+        else:
+            flags[step] = REJECTED
+    return score, flags
+
+TWO_OPT = TwoOptMove()
+OR_OPT = OrOptMove()
@@ -0,0 +1,110 @@
+import os
+import numpy as np
+import tsplib
+
+CHUNK_ROWS = tsplib.CHUNK_ROWS
+RAW_DTYPE = np.float32
+RAW_EXTENSIONS = (".f32", ".raw", ".bin")
+TEXT_EXTENSIONS = (".csv", ".txt", ".xy")
+
+# point sets of any size as (n, 2) arrays
+# binary files are memory-mapped, text files are parsed in chunks into an array allocated once, so memory stays near the size of the data
+
+def checked(points, path):
+    if points.ndim != 2 or points.shape[1] != 2:
+        raise ValueError(f"{path}: expected (n, 2) coordinates, got shape {points.shape}")
+    return points
+
+def load_npy(path, mmap=True):
+    return checked(np.load(path, mmap_mode="r" if mmap else None), path)
+
+def load_raw(path, dtype=RAW_DTYPE):
+    # headerless file of x, y pairs
+    size = os.path.getsize(path)
+    pair = 2 * np.dtype(dtype).itemsize
+    if size % pair:
+        raise ValueError(f"{path}: size {size} is not a multiple of {pair} bytes")
+    if size == 0:
+        return np.empty((0, 2), dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=(size // pair, 2))
+
+def _text_start(file, delimiter):
+    # skip blank lines and a header row, returns number of data rows after the current position
+    start = file.tell()
+    line = file.readline()
+    while line and not line.strip():
+        start = file.tell()
+        line = file.readline()
+    try:
+        [float(value) for value in line.split(delimiter)[:2]]
+    except ValueError:
+        start = file.tell()
+    file.seek(start)
+    rows = sum(1 for line in file if line.strip())
+    file.seek(start)
+    return rows
+
+def iter_text(path, delimiter=",", usecols=(0, 1), chunk_rows=CHUNK_ROWS):
+    # (rows, 2) chunks of a delimited text file with an optional header row
+    with open(path) as file:
+        remaining = _text_start(file, delimiter)
+        # loadtxt warns about every blank line it skips, so it only sees the others
+        lines = (line for line in file if line.strip())
+        while remaining > 0:
+            chunk = np.loadtxt(lines, delimiter=delimiter, usecols=usecols, max_rows=min(chunk_rows, remaining), ndmin=2)
+            if len(chunk) == 0:
+                return
+            remaining -= len(chunk)
+            yield chunk
+
+def load_text(path, delimiter=",", usecols=(0, 1), chunk_rows=CHUNK_ROWS, out=None):
+    # rows are counted first, so the array is allocated once, out may be a memory-mapped array of that shape
+    with open(path) as file:
+        rows = _text_start(file, delimiter)
+    points = np.empty((rows, 2), dtype=np.float64) if out is None else out
+    if points.shape != (rows, 2):
+        raise ValueError(f"{path}: expected output of shape {(rows, 2)}, got {points.shape}")
+    loaded = 0
+    for chunk in iter_text(path, delimiter, usecols, chunk_rows):
+        points[loaded:loaded + len(chunk)] = chunk
+        loaded += len(chunk)
+    return points
+
+def _delimiter(path):
+    return None if os.path.splitext(path)[1].lower() in (".txt", ".xy") else ","
+
+def load(path, mmap=True):
+    # coordinates of a .npy, raw float32, csv / whitespace separated text or TSPLIB file chosen by extension
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".npy":
+        return load_npy(path, mmap)
+    if extension in RAW_EXTENSIONS:
+        points = load_raw(path)
+        return points if mmap else np.array(points)
+    if extension in TEXT_EXTENSIONS:
+        return load_text(path, _delimiter(path))
+    if extension == ".tsp":
+        return tsplib.load(path).coordinates
+    raise ValueError(f"{path}: unknown point file type {extension!r}")
+
+def convert(source, destination, dtype=np.float64):
+    # text or TSPLIB file to a .npy file written through a memory map, for loading it with load_npy later
+    extension = os.path.splitext(source)[1].lower()
+    if extension == ".tsp":
+        with open(source) as file:
+            dimension = next(int(line.partition(":")[2]) for line in file if line.split(":")[0].strip().upper() == "DIMENSION")
+        out = np.lib.format.open_memmap(destination, mode="w+", dtype=dtype, shape=(dimension, 2))
+        tsplib.load(source, out)
+    elif extension in TEXT_EXTENSIONS:
+        delimiter = _delimiter(source)
+        with open(source) as file:
+            rows = _text_start(file, delimiter)
+        out = np.lib.format.open_memmap(destination, mode="w+", dtype=dtype, shape=(rows, 2))
+        load_text(source, delimiter, out=out)
+    else:
+        points = load(source)
+        out = np.lib.format.open_memmap(destination, mode="w+", dtype=dtype, shape=points.shape)
+        for start in range(0, len(points), CHUNK_ROWS):
+            out[start:start + CHUNK_ROWS] = points[start:start + CHUNK_ROWS]
+    out.flush()
+    return out
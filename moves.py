@@ -0,0 +1,155 @@
+import numpy as np
+
+OR_OPT_LENGTH = 3
+
+class Tour:
+    # closed route over points of a distance store, order[i] is the point visited at position i
+    # position is the inverse permutation, neighbours optional (n, k) candidate lists
+    def __init__(self, store, order, neighbours=None):
+        self.store = store
+        self.order = order
+        self.position = np.empty_like(order)
+        self.position[order] = np.arange(len(order))
+        self.neighbours = neighbours
+
+    def __len__(self):
+        return len(self.order)
+
+    def successor(self, point):
+        return self.order[(self.position[point] + 1) % len(self.order)]
+
+    def predecessor(self, point):
+        return self.order[self.position[point] - 1]
+
+    def candidate(self, point, rng):
+        # random point close to given one, any other point without neighbour lists
+        if self.neighbours is not None and self.neighbours.shape[1] > 0:
+            return self.neighbours[point, int(rng.random() * self.neighbours.shape[1])]
+        other = int(rng.random() * (len(self.order) - 1))
+        return other + (other >= point)
+
+    def rewrite(self, start, values):
+        # write values to consecutive positions from start, wrapping around
+        indices = (start + np.arange(len(values))) % len(self.order)
+        self.order[indices] = values
+        self.position[values] = indices
+
+    def segment(self, start, length):
+        # points at consecutive positions from start, wrapping around
+        return self.order[(start + np.arange(length)) % len(self.order)]
+
+    def reverse(self, start, end):
+        # reverse positions start..end, the shorter of the segment and its complement is reversed
+        count = len(self.order)
+        length = (end - start) % count + 1
+        if 2 * length > count:
+            start, length = (end + 1) % count, count - length
+        self.rewrite(start, self.segment(start, length)[::-1])
+
+class SwapMove:
+    # exchange points at two random positions
+    def propose(self, tour, rng):
+        count = len(tour)
+        if count < 2:
+            return None
+        index_a = int(rng.random() * count)
+        index_b = int(rng.random() * count)
+        while index_b == index_a:
+            index_b = int(rng.random() * count)
+        return index_a, index_b
+
+    def edges_length(self, tour, edges):
+        # length of route edges, edge i connects position i and i + 1
+        count = len(tour)
+        distance = 0
+        for i in edges:
+            distance += tour.store.distance(tour.order[i], tour.order[(i + 1) % count])
+        return distance
+
+    def delta(self, tour, move):
+        # only edges touching the two positions change
+        index_a, index_b = move
+        count = len(tour)
+        edges = {(index_a - 1) % count, index_a, (index_b - 1) % count, index_b}
+        before = self.edges_length(tour, edges)
+        self.swap(tour, index_a, index_b)
+        after = self.edges_length(tour, edges)
+        self.swap(tour, index_a, index_b)
+        return after - before
+
+    def swap(self, tour, index_a, index_b):
+        order = tour.order
+        order[index_a], order[index_b] = order[index_b], order[index_a]
+
+    def apply(self, tour, move):
+        index_a, index_b = move
+        self.swap(tour, index_a, index_b)
+        tour.position[tour.order[index_a]] = index_a
+        tour.position[tour.order[index_b]] = index_b
+
+class TwoOptMove:
+    # connect point a with its near point b by reversing the route between them
+    def propose(self, tour, rng):
+        if len(tour) < 4:
+            return None
+        a = tour.order[int(rng.random() * len(tour))]
+        b = tour.candidate(a, rng)
+        successor_a = tour.successor(a)
+        successor_b = tour.successor(b)
+        if b == successor_a or a == successor_b:
+            return None
+        return a, b, successor_a, successor_b
+
+    def delta(self, tour, move):
+        # edges (a, a+1) and (b, b+1) become (a, b) and (a+1, b+1)
+        a, b, successor_a, successor_b = move
+        distance = tour.store.distance
+        return distance(a, b) + distance(successor_a, successor_b) - distance(a, successor_a) - distance(b, successor_b)
+
+    def apply(self, tour, move):
+        _, b, successor_a, _ = move
+        tour.reverse(tour.position[successor_a], tour.position[b])
+
+class OrOptMove:
+    # relocate a segment of up to three points starting at point a next to a near point c
+    def __init__(self, max_length=OR_OPT_LENGTH):
+        self.max_length = max_length
+
+    def propose(self, tour, rng):
+        count = len(tour)
+        length = 1 + int(rng.random() * self.max_length)
+        if count - length < 3:
+            return None
+        start = int(rng.random() * count)
+        first = tour.order[start]
+        last = tour.order[(start + length - 1) % count]
+        c = tour.candidate(first, rng)
+        offset = (tour.position[c] - start) % count
+        if offset < length or offset == count - 1:
+            # c inside the segment or directly before it
+            return None
+        previous = tour.order[start - 1]
+        following = tour.order[(start + length) % count]
+        successor_c = tour.successor(c)
+        distance = tour.store.distance
+        removed = distance(previous, following) - distance(previous, first) - distance(last, following) - distance(c, successor_c)
+        forward = distance(c, first) + distance(last, successor_c)
+        backward = distance(c, last) + distance(first, successor_c)
+        reverse = backward < forward
+        return start, length, offset, reverse, removed + min(forward, backward)
+
+    def delta(self, tour, move):
+        return move[4]
+
+    def apply(self, tour, move):
+        start, length, offset, reverse, _ = move
+        count = len(tour)
+        segment = tour.segment(start, length)
+        if reverse:
+            segment = segment[::-1]
+        if offset + 1 <= count - offset - 1 + length:
+            # points between segment and c move back, segment follows c
+            tour.rewrite(start, np.concatenate((tour.segment(start + length, offset + 1 - length), segment)))
+        else:
+            # points after c move forward, segment precedes them
+            tour.rewrite(start + offset + 1, np.concatenate((segment, tour.segment(start + offset + 1, count - offset - 1))))
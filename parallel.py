@@ -0,0 +1,136 @@
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import kernels
+from annealing import BLOCK, INITIAL_TEMPERATURE, KERNEL_MOVES, NEIGHBOURS, SEEDED_ACCEPTANCE, STOPPING_TEMPERATURE, TEMPERATURE_SAMPLES, Evaluate, Initialize, SampleDeltas
+from distances import PointStore
+from moves import Tour
+from schedules import INITIAL_ACCEPTANCE, initial_temperature
+from spatial import neighbour_lists
+
+SWEEP = 1000
+CHAIN_ITERATIONS = 1000
+
+_STORE = None
+_NEIGHBOURS = None
+
+def _init_worker(points):
+    # every worker process builds the distance store and candidate lists once
+    global _STORE, _NEIGHBOURS
+    _STORE = PointStore(points)
+    _NEIGHBOURS = neighbour_lists(_STORE.points, NEIGHBOURS)
+
+def run_chain(solution, rng, temperature, decay, iterations):
+    # anneal one route in place for given number of iterations, temperature is multiplied by decay after each step
+    # steps run in blocks of the annealing kernel, the best route is taken between blocks
+    start = time.perf_counter()
+    tour = Tour(_STORE, solution, _NEIGHBOURS)
+    score = Evaluate(_STORE, solution)
+    best_score, best_solution = score, solution.copy()
+    accepted = 0
+    for step in range(0, iterations, BLOCK):
+        temperatures = temperature * decay ** np.arange(min(BLOCK, iterations - step))
+        score, flags = kernels.anneal(tour, score, temperatures, rng)
+        accepted += int(np.count_nonzero(flags == kernels.ACCEPTED))
+        if score < best_score:
+            best_score = score
+            best_solution = solution.copy()
+        temperature = temperatures[-1] * decay
+    statistics = {
+        "iterations": iterations,
+        "accepted": accepted,
+        "seconds": time.perf_counter() - start,
+    }
+    return solution, Evaluate(_STORE, best_solution), best_solution, rng, statistics
+
+def start_chain(count, seed, initial_temperature, stopping_temperature, iterations, start=None):
+    # independent chain from a random permutation or a copy of start, cooled to stopping temperature in iterations steps
+    rng = np.random.default_rng(seed)
+    solution = Initialize(count, rng) if start is None else start.copy()
+    decay = (stopping_temperature / initial_temperature) ** (1 / max(iterations, 1))
+    _, best_score, best_solution, _, statistics = run_chain(solution, rng, initial_temperature, decay, iterations)
+    statistics["score"] = best_score
+    return best_score, best_solution, statistics
+
+def estimate_temperatures(points, start=None, rng=None):
+    # initial and stopping temperature of annealing points from moves sampled on the route start or a random one
+    # a route given as start is already good and gets a low acceptance, the stop keeps the ratio of the default schedule
+    order = Initialize(len(points), rng) if start is None else np.array(start)
+    tour = Tour(PointStore(points), order, neighbour_lists(points, NEIGHBOURS))
+    deltas = SampleDeltas(tour, TEMPERATURE_SAMPLES, rng, KERNEL_MOVES)
+    initial = initial_temperature(deltas, SEEDED_ACCEPTANCE if start is not None else INITIAL_ACCEPTANCE, INITIAL_TEMPERATURE)
+    return initial, initial * STOPPING_TEMPERATURE / INITIAL_TEMPERATURE
+
+def multi_start(points, chains=None, seed=None, workers=None, initial_temperature=None, stopping_temperature=None, iterations=None, start=None):
+    # K independent annealing chains over all cores, returns best score, best route and per-chain statistics
+    # every chain runs iterations steps, CHAIN_ITERATIONS per point unless given
+    # chains start from random permutations or from the route start, temperatures not given are estimated from moves sampled on it
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    chains = chains or os.cpu_count()
+    iterations = iterations or CHAIN_ITERATIONS * len(points)
+    sequence = np.random.SeedSequence(seed)
+    if initial_temperature is None:
+        initial_temperature, estimated_stopping = estimate_temperatures(points, start, np.random.default_rng(sequence.spawn(1)[0]))
+        stopping_temperature = stopping_temperature or estimated_stopping
+    stopping_temperature = stopping_temperature or STOPPING_TEMPERATURE
+    if initial_temperature <= stopping_temperature:
+        raise ValueError(f"initial temperature {initial_temperature} is not above the stopping temperature {stopping_temperature}")
+    seeds = sequence.spawn(chains)
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(points,)) as executor:
+        futures = [executor.submit(start_chain, len(points), chain_seed, initial_temperature, stopping_temperature, iterations, start) for chain_seed in seeds]
+        results = [future.result() for future in futures]
+    best_score, best_solution, _ = min(results, key=lambda result: result[0])
+    return best_score, best_solution, [statistics for _, _, statistics in results]
+
+def temperature_ladder(replicas, low, high):
+    # geometrically spaced replica temperatures
+    if replicas == 1:
+        return np.array([low], dtype=float)
+    return low * (high / low) ** (np.arange(replicas) / (replicas - 1))
+
+def parallel_tempering(points, replicas=None, rounds=None, sweep=SWEEP, seed=None, workers=None, low=None, high=None, start=None):
+    # replicas anneal at fixed temperatures and exchange states between neighbouring temperatures after every sweep
+    # replicas start from random permutations or from the route start, a ladder not given spans the temperatures
+    # estimated from moves sampled on it, rounds make CHAIN_ITERATIONS steps per point and replica unless given
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    replicas = replicas or os.cpu_count()
+    rounds = rounds or math.ceil(CHAIN_ITERATIONS * len(points) / sweep)
+    sequence = np.random.SeedSequence(seed)
+    estimate_rng, swap_rng = (np.random.default_rng(child) for child in sequence.spawn(2))
+    if low is None or high is None:
+        initial, stopping = estimate_temperatures(points, start, estimate_rng)
+        low, high = low or stopping, high or initial
+    temperatures = temperature_ladder(replicas, low, high)
+    rngs = [np.random.default_rng(replica_seed) for replica_seed in sequence.spawn(replicas)]
+    solutions = [Initialize(len(points), rng) if start is None else np.array(start) for rng in rngs]
+    store = PointStore(points)
+    scores = [Evaluate(store, solution) for solution in solutions]
+    best_score, best_solution = min(zip(scores, solutions), key=lambda item: item[0])
+    best_solution = best_solution.copy()
+    statistics = [{"temperature": float(temperature), "iterations": 0, "accepted": 0, "seconds": 0.0, "swaps": 0, "swap_attempts": 0} for temperature in temperatures]
+
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(points,)) as executor:
+        for round_index in range(rounds):
+            futures = [executor.submit(run_chain, solutions[k], rngs[k], temperatures[k], 1.0, sweep) for k in range(replicas)]
+            for k, future in enumerate(futures):
+                solutions[k], replica_best, replica_best_solution, rngs[k], chain = future.result()
+                scores[k] = Evaluate(store, solutions[k])
+                for key in ("iterations", "accepted", "seconds"):
+                    statistics[k][key] += chain[key]
+                if replica_best < best_score:
+                    best_score, best_solution = replica_best, replica_best_solution
+            # alternate even and odd neighbour pairs, attempts and swaps count for both replicas of a pair
+            for k in range(round_index % 2, replicas - 1, 2):
+                statistics[k]["swap_attempts"] += 1
+                statistics[k + 1]["swap_attempts"] += 1
+                exponent = (1 / temperatures[k] - 1 / temperatures[k + 1]) * (scores[k] - scores[k + 1])
+                if exponent >= 0 or math.exp(exponent) > swap_rng.uniform():
+                    solutions[k], solutions[k + 1] = solutions[k + 1], solutions[k]
+                    scores[k], scores[k + 1] = scores[k + 1], scores[k]
+                    statistics[k]["swaps"] += 1
+                    statistics[k + 1]["swaps"] += 1
+    for k in range(replicas):
+        statistics[k]["score"] = scores[k]
+    return best_score, best_solution, statistics
@@ -0,0 +1,31 @@
+import threading
+
+class Mailbox:
+    # latest state published by a solver thread for a renderer, states not taken in time are dropped
+    # a publisher may check pending to skip building states the renderer would drop anyway
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.state = None
+        self.pending = False
+        self.published = 0
+        self.dropped = 0
+
+    def publish(self, state):
+        with self.condition:
+            if self.pending:
+                self.dropped += 1
+            self.state = state
+            self.pending = True
+            self.published += 1
+            self.condition.notify_all()
+
+    def take(self, timeout=0):
+        # latest state, None when nothing new was published within timeout seconds
+        with self.condition:
+            if not self.pending and timeout:
+                self.condition.wait(timeout)
+            if not self.pending:
+                return None
+            self.pending = False
+            state, self.state = self.state, None
+            return state
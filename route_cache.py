@@ -0,0 +1,104 @@
+import hashlib
+import json
+import sqlite3
+import time
+from collections import OrderedDict
+import numpy as np
+
+MAX_SIZE = 4096
+MAX_PERSISTED = 1000000
+COMMIT_EVERY = 256
+
+class RouteCache:
+    # optimized routes keyed by a hash of coordinate arrays, e.g. points of a route in canonical order and its helicopter
+    # keeps the max_size most recently used entries in memory, optionally persisted to a sqlite file
+    # writes are committed every commit_every puts and on close, times of reads from the file are written with them
+    def __init__(self, max_size=MAX_SIZE, path=None, max_persisted=MAX_PERSISTED, commit_every=COMMIT_EVERY):
+        self.max_size = max_size
+        self.max_persisted = max_persisted
+        self.commit_every = commit_every
+        self.entries = OrderedDict()
+        self.connection = None
+        self.used = {}
+        self.pending = 0
+        if path is not None:
+            self.connection = sqlite3.connect(path, check_same_thread=False)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS routes (key TEXT PRIMARY KEY, value TEXT, used REAL)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS routes_used ON routes (used)")
+            self.connection.commit()
+            self.persisted = self.connection.execute("SELECT COUNT(*) FROM routes").fetchone()[0]
+
+    def __len__(self):
+        return len(self.entries)
+
+    @staticmethod
+    def key(*arrays):
+        # callers put the points in an order that does not depend on how they are numbered
+        digest = hashlib.sha1()
+        for points in arrays:
+            points = np.ascontiguousarray(points, dtype=np.float64)
+            digest.update(len(points).to_bytes(8, "little"))
+            digest.update(points.tobytes())
+        return digest.hexdigest()
+
+    def get(self, key):
+        # (score, route) with route as array of point positions, None when missing
+        value = self.entries.get(key)
+        if value is not None:
+            self.entries.move_to_end(key)
+            return value
+        if self.connection is None:
+            return None
+        row = self.connection.execute("SELECT value FROM routes WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        score, route = json.loads(row[0])
+        value = (score, np.array(route, dtype=np.intp))
+        self.used[key] = time.time()
+        self.remember(key, value)
+        return value
+
+    def put(self, key, score, route):
+        value = (float(score), np.array(route, dtype=np.intp))
+        self.remember(key, value)
+        if self.connection is not None:
+            data = json.dumps([value[0], value[1].tolist()])
+            if self.connection.execute("SELECT 1 FROM routes WHERE key = ?", (key,)).fetchone() is None:
+                self.persisted += 1
+            self.connection.execute("INSERT OR REPLACE INTO routes VALUES (?, ?, ?)", (key, data, time.time()))
+            self.used.pop(key, None)
+            if self.persisted > self.max_persisted:
+                self.connection.execute("DELETE FROM routes WHERE key IN (SELECT key FROM routes ORDER BY used LIMIT ?)", (self.persisted - self.max_persisted,))
+                self.persisted = self.max_persisted
+            self.pending += 1
+            if self.pending >= self.commit_every:
+                self.commit()
+
+    def commit(self):
+        # write times of reads and commit the puts since the last commit
+        if self.connection is None:
+            return
+        self.connection.executemany("UPDATE routes SET used = ? WHERE key = ?", [(used, key) for key, used in self.used.items()])
+        self.connection.commit()
+        self.used.clear()
+        self.pending = 0
+
+    def remember(self, key, value):
+        if self.max_size <= 0:
+            return
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        # forget entries held in memory, persisted routes stay
+        self.entries.clear()
+
+    def close(self):
+        if self.connection is not None:
+            self.commit()
+            self.connection.close()
+            self.connection = None
@@ -0,0 +1,79 @@
+import numpy as np
+
+UNIFORM_BLOCK = 4096
+
+class WeightTree:
+    # items drawn with probability proportional to their weights, which may change one at a time
+    # partial sums are kept in a Fenwick tree, so drawing an item and changing a weight take O(log n)
+    def __init__(self, weights):
+        self.weights = np.array(weights, dtype=np.float64).reshape(-1)
+        count = len(self.weights)
+        prefix = np.concatenate(([0], np.cumsum(self.weights)))
+        index = np.arange(1, count + 1)
+        tree = np.zeros(count + 1)
+        tree[1:] = prefix[index] - prefix[index - (index & -index)]
+        self.tree = tree.tolist()
+        self.total = float(prefix[-1])
+        self.top = 1 << (count.bit_length() - 1) if count else 0
+
+    def __len__(self):
+        return len(self.weights)
+
+    def state(self):
+        # weights, partial sums and total, partial sums changed by updates differ slightly from fresh ones
+        return self.weights.copy(), np.array(self.tree), self.total
+
+    @classmethod
+    def restore(cls, weights, tree, total):
+        restored = cls(weights)
+        restored.tree = np.asarray(tree, dtype=np.float64).tolist()
+        restored.total = float(total)
+        return restored
+
+    def update(self, item, weight):
+        change = float(weight) - self.weights[item]
+        self.weights[item] = weight
+        self.total += change
+        index = item + 1
+        while index < len(self.tree):
+            self.tree[index] += change
+            index += index & -index
+
+    def sample(self, random):
+        # item at uniform random number random from [0, 1)
+        value = random * self.total
+        position = 0
+        step = self.top
+        while step:
+            following = position + step
+            if following < len(self.tree) and self.tree[following] <= value:
+                position = following
+                value -= self.tree[following]
+            step >>= 1
+        return min(position, len(self.weights) - 1)
+
+class Uniforms:
+    # uniform numbers of a generator drawn in blocks and handed out one at a time by random()
+    # stands in for the generator where single numbers are drawn, random(size) draws an array directly
+    def __init__(self, rng, block=UNIFORM_BLOCK):
+        self.rng = rng
+        self.block = block
+        self.values = []
+
+    def random(self, size=None):
+        if size is not None:
+            return self.rng.random(size)
+        if not self.values:
+            self.values = self.rng.random(self.block).tolist()
+            self.values.reverse()
+        return self.values.pop()
+
+    def shuffle(self, values):
+        self.rng.shuffle(values)
+
+def streams(rng, count):
+    # count independent generators spawned from a generator, seed or SeedSequence, None seeds them from the system
+    if isinstance(rng, np.random.Generator):
+        return rng.spawn(count)
+    sequence = rng if isinstance(rng, np.random.SeedSequence) else np.random.SeedSequence(rng)
+    return [np.random.default_rng(child) for child in sequence.spawn(count)]
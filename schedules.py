@@ -0,0 +1,187 @@
+import math
+import time
+import numpy as np
+
+INITIAL_ACCEPTANCE = 0.8
+IMPROVEMENT = 1e-9
+
+def initial_temperature(deltas, acceptance=INITIAL_ACCEPTANCE, default=None):
+    # temperature at which an average uphill move is accepted with given probability
+    deltas = np.asarray(deltas, dtype=np.float64)
+    uphill = deltas[deltas > 0]
+    if len(uphill) == 0:
+        return default
+    return float(-uphill.mean() / math.log(acceptance))
+
+class Schedule:
+    # temperature of one annealing run started by start, subclasses define the cooling rule in cool
+    # the run stops below stopping temperature, after stagnation steps without a new best score or once budget seconds passed
+    # with reheat the temperature is multiplied by it after patience steps without a new best, never above the initial one
+    def __init__(self, initial=None, stopping=1, stagnation=None, budget=None, reheat=None, patience=None, clock=time.perf_counter):
+        self.initial = initial
+        self.stopping = stopping
+        self.stagnation = stagnation
+        self.budget = budget
+        self.reheat = reheat
+        self.patience = patience
+        self.clock = clock
+
+    def start(self, initial=None):
+        # reset for a new run, initial temperature overrides the configured one
+        self.temperature = self.top = initial or self.initial
+        if self.temperature is None or self.stopping is None:
+            raise ValueError("initial or stopping temperature is not known")
+        if self.temperature <= self.stopping:
+            raise ValueError(f"initial temperature {self.temperature} is not above the stopping temperature {self.stopping}")
+        self.steps = 0
+        self.best = math.inf
+        self.since_best = 0
+        self.since_reheat = 0
+        self.started = self.clock()
+        return self
+
+    def elapsed(self):
+        return self.clock() - self.started
+
+    def running(self):
+        if self.temperature <= self.stopping:
+            return False
+        if self.stagnation is not None and self.since_best >= self.stagnation:
+            return False
+        return self.budget is None or self.elapsed() < self.budget
+
+    def step(self, score=None):
+        # advance after one iteration with current score of the search
+        self.following = self.cool(self.temperature)
+        return self.advance(1, score)
+
+    def block(self, count):
+        # temperatures of up to count next iterations above the stopping temperature, advance moves past them
+        temperatures = self.sequence(self.temperature, count + 1)
+        steps = int(np.count_nonzero(temperatures[:count] > self.stopping))
+        self.following = temperatures[steps]
+        return temperatures[:steps]
+
+    def advance(self, steps, score=None):
+        # account for steps iterations ending with current score of the search
+        self.steps += steps
+        if score is not None and score < self.best - IMPROVEMENT:
+            self.best = score
+            self.since_best = 0
+            self.since_reheat = 0
+        else:
+            self.since_best += steps
+            self.since_reheat += steps
+        if self.reheat is not None and self.patience is not None and self.since_reheat >= self.patience:
+            self.since_reheat = 0
+            self.temperature = min(self.following * self.reheat, self.top)
+        else:
+            self.temperature = self.following
+        return self.temperature
+
+    def cool(self, temperature):
+        raise NotImplementedError
+
+    def state(self):
+        # json serializable attributes, the start of a run is kept as seconds elapsed since it
+        state = {key: value for key, value in vars(self).items() if key not in ("clock", "started")}
+        state["type"] = type(self).__name__
+        state["elapsed"] = self.elapsed() if hasattr(self, "started") else None
+        return state
+
+    @staticmethod
+    def restore(state, clock=time.perf_counter):
+        # schedule of the type and in the state saved by state, its run continues from there
+        state = dict(state)
+        schedule = object.__new__(TYPES[state.pop("type")])
+        elapsed = state.pop("elapsed")
+        vars(schedule).update(state)
+        schedule.clock = clock
+        if elapsed is not None:
+            schedule.started = clock() - elapsed
+        return schedule
+
+    def sequence(self, temperature, count):
+        # temperature followed by count - 1 cooled ones
+        temperatures = np.empty(count)
+        for k in range(count):
+            temperatures[k] = temperature
+            temperature = self.cool(temperature)
+        return temperatures
+
+class Geometric(Schedule):
+    # temperature multiplied by constant decay
+    def __init__(self, initial=None, stopping=1, decay=0.95, **options):
+        self.decay = decay
+        super().__init__(initial, stopping, **options)
+
+    def cool(self, temperature):
+        return temperature * self.decay
+
+    def sequence(self, temperature, count):
+        return temperature * self.decay ** np.arange(count)
+
+class LundyMees(Schedule):
+    # t / (1 + beta t), beta derived from the number of steps from initial to stopping temperature when not given
+    def __init__(self, initial=None, stopping=1, beta=None, steps=1000, **options):
+        self.beta = beta
+        self.length = steps
+        super().__init__(initial, stopping, **options)
+
+    def start(self, initial=None):
+        super().start(initial)
+        self.rate = self.beta
+        if self.rate is None:
+            self.rate = (1 / self.stopping - 1 / self.temperature) / self.length
+        return self
+
+    def cool(self, temperature):
+        return temperature / (1 + self.rate * temperature)
+
+    def sequence(self, temperature, count):
+        return 1 / (1 / temperature + self.rate * np.arange(count))
+
+class Timed(Geometric):
+    # geometric cooling over a wall clock budget, the decay is refitted every step from the time per step measured so far
+    # so that the stopping temperature is reached when the budget runs out
+    def __init__(self, budget, initial=None, stopping=1, decay=0.95, **options):
+        self.guess = decay
+        super().__init__(initial, stopping, decay, budget=budget, **options)
+
+    def start(self, initial=None):
+        self.decay = self.guess
+        return super().start(initial)
+
+    def cool(self, temperature):
+        elapsed = self.elapsed()
+        remaining = self.budget - elapsed
+        if self.steps > 0 and elapsed > 0 and remaining > 0 and temperature > self.stopping:
+            remaining_steps = max(remaining * self.steps / elapsed, 1)
+            self.decay = (self.stopping / temperature) ** (1 / remaining_steps)
+        return temperature * self.decay
+
+    def sequence(self, temperature, count):
+        # decay refitted once per block
+        self.cool(temperature)
+        return super().sequence(temperature, count)
+
+class TimedLundyMees(LundyMees):
+    # lundy-mees cooling over a wall clock budget, beta is refitted every step from the time per step measured so far
+    # so that the stopping temperature is reached when the budget runs out
+    def __init__(self, budget, initial=None, stopping=1, beta=None, steps=1000, **options):
+        super().__init__(initial, stopping, beta, steps, budget=budget, **options)
+
+    def cool(self, temperature):
+        elapsed = self.elapsed()
+        remaining = self.budget - elapsed
+        if self.steps > 0 and elapsed > 0 and remaining > 0 and temperature > self.stopping:
+            remaining_steps = max(remaining * self.steps / elapsed, 1)
+            self.rate = (1 / self.stopping - 1 / temperature) / remaining_steps
+        return super().cool(temperature)
+
+    def sequence(self, temperature, count):
+        # beta refitted once per block
+        self.cool(temperature)
+        return super().sequence(temperature, count)
+
+TYPES = {schedule.__name__: schedule for schedule in (Geometric, LundyMees, Timed, TimedLundyMees)}
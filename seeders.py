@@ -0,0 +1,194 @@
+import numpy as np
+from scipy.spatial import cKDTree
+from spatial import neighbour_lists
+from steiner import Graph, adjacency
+
+NEAREST_CANDIDATES = 8
+GREEDY_CANDIDATES = 10
+HILBERT_BITS = 16
+
+# constructive tours over (n, 2) points, returned as orders of point indices
+# they start annealing close to a good tour, so a short schedule is enough
+
+class _Unvisited:
+    # nearest not yet visited points, the kd tree is rebuilt over the rest once half of its points were visited
+    def __init__(self, points):
+        self.points = points
+        self.visited = np.zeros(len(points), dtype=bool)
+        self.rebuild()
+
+    def rebuild(self):
+        self.indices = np.flatnonzero(~self.visited)
+        self.tree = cKDTree(self.points[self.indices])
+        self.stale = 0
+
+    def visit(self, point):
+        self.visited[point] = True
+        self.stale += 1
+        if 2 * self.stale > len(self.indices) and self.stale < len(self.indices):
+            self.rebuild()
+
+    def nearest(self, point):
+        # closest unvisited point to point, None when all are visited
+        k = NEAREST_CANDIDATES
+        while True:
+            k = min(k, len(self.indices))
+            _, found = self.tree.query(self.points[point], k)
+            found = self.indices[np.atleast_1d(found)]
+            free = found[~self.visited[found]]
+            if len(free):
+                return free[0]
+            if k == len(self.indices):
+                return None
+            k *= 2
+
+def nearest_neighbour(points, start=0):
+    # walk to the closest unvisited point, about 25% above optimum
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    count = len(points)
+    if count <= 3:
+        return np.arange(count)
+    order = np.empty(count, dtype=np.intp)
+    unvisited = _Unvisited(points)
+    point = start
+    for step in range(count):
+        order[step] = point
+        unvisited.visit(point)
+        if step + 1 < count:
+            point = unvisited.nearest(point)
+    return order
+
+def greedy_edge(points, k=GREEDY_CANDIDATES):
+    # shortest candidate edges between k nearest neighbours that keep degrees at most two and close no cycle,
+    # the resulting paths are joined end to end in nearest neighbour order, about 15-20% above optimum
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    count = len(points)
+    if count <= 3:
+        return np.arange(count)
+    neighbours = neighbour_lists(points, k)
+    first = np.repeat(np.arange(count), neighbours.shape[1])
+    second = neighbours.ravel()
+    edges = np.unique(np.column_stack((np.minimum(first, second), np.maximum(first, second))), axis=0)
+    delta = points[edges[:, 0]] - points[edges[:, 1]]
+    edges = edges[np.argsort(np.hypot(delta[:, 0], delta[:, 1]), kind="stable")]
+
+    parent = list(range(count))
+    degree = [0] * count
+    links = [[] for _ in range(count)]
+    added = 0
+    for u, v in edges.tolist():
+        if degree[u] == 2 or degree[v] == 2:
+            continue
+        x, y = u, v
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        while parent[y] != y:
+            parent[y] = parent[parent[y]]
+            y = parent[y]
+        if x == y:
+            continue
+        parent[x] = y
+        degree[u] += 1
+        degree[v] += 1
+        links[u].append(v)
+        links[v].append(u)
+        added += 1
+        if added == count - 1:
+            break
+
+    # paths from their ends, an isolated point is a path of its own
+    paths = []
+    tail = np.empty(count, dtype=np.intp)
+    seen = [False] * count
+    for start in range(count):
+        if seen[start] or degree[start] == 2:
+            continue
+        path = [start]
+        seen[start] = True
+        previous, point = -1, start
+        while True:
+            following = [other for other in links[point] if other != previous]
+            if not following:
+                break
+            previous, point = point, following[0]
+            path.append(point)
+            seen[point] = True
+        paths.append(path)
+        tail[path[0]] = tail[path[-1]] = len(paths) - 1
+    if len(paths) == 1:
+        return np.array(paths[0], dtype=np.intp)
+
+    # walk over ends of paths, every path is entered at the closest end and left at the other one
+    ends = np.array([end for path in paths for end in {path[0], path[-1]}], dtype=np.intp)
+    unvisited = _Unvisited(points[ends])
+    position = {end: i for i, end in enumerate(ends.tolist())}
+    order = []
+    path = paths[0]
+    while True:
+        order += path
+        for end in {path[0], path[-1]}:
+            unvisited.visit(position[end])
+        following = unvisited.nearest(position[path[-1]])
+        if following is None:
+            break
+        end = ends[following]
+        path = paths[tail[end]]
+        if path[0] != end:
+            path = path[::-1]
+    return np.array(order, dtype=np.intp)
+
+def hilbert_order(points, bits=HILBERT_BITS):
+    # points sorted along a hilbert curve over their bounding box, about 40% above optimum for uniform points but nearly free
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    if len(points) <= 3:
+        return np.arange(len(points))
+    low = points.min(axis=0)
+    extent = max(np.ptp(points, axis=0).max(), np.finfo(np.float64).tiny)
+    side = 1 << bits
+    cells = np.minimum(((points - low) / extent * side).astype(np.int64), side - 1)
+    x, y = cells[:, 0].copy(), cells[:, 1].copy()
+    distance = np.zeros(len(points), dtype=np.int64)
+    step = side >> 1
+    while step > 0:
+        right = (x & step) > 0
+        up = (y & step) > 0
+        distance += step * step * ((3 * right) ^ up)
+        # rotate the quadrant so that the curve inside it starts and ends at the right corners
+        flip = ~up & right
+        x = np.where(flip, side - 1 - x, x)
+        y = np.where(flip, side - 1 - y, y)
+        swap = ~up
+        x, y = np.where(swap, y, x), np.where(swap, x, y)
+        step >>= 1
+    return np.argsort(distance, kind="stable")
+
+def mst_tour(points):
+    # preorder walk of the euclidean minimum spanning tree, at most twice the optimum
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    count = len(points)
+    if count <= 3:
+        return np.arange(count)
+    g = Graph(points)
+    g.mst()
+    edges = g.edge_array()
+    indptr, neighbours, _ = adjacency(count, edges[:, 0], edges[:, 1])
+    indptr, neighbours = indptr.tolist(), neighbours.tolist()
+    order = []
+    seen = [False] * count
+    stack = [0]
+    while stack:
+        point = stack.pop()
+        if seen[point]:
+            continue
+        seen[point] = True
+        order.append(point)
+        stack += [other for other in neighbours[indptr[point]:indptr[point + 1]] if not seen[other]]
+    return np.array(order, dtype=np.intp)
+
+SEEDERS = {
+    "nearest": nearest_neighbour,
+    "greedy": greedy_edge,
+    "hilbert": hilbert_order,
+    "mst": mst_tour,
+}
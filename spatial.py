@@ -0,0 +1,139 @@
+import heapq
+import math
+import numpy as np
+from scipy.spatial import Delaunay, cKDTree
+try:
+    from scipy.spatial import QhullError
+except ImportError:
+    from scipy.spatial.qhull import QhullError
+
+RESIZE_FACTOR = 4
+
+class SpatialHash:
+    # uniform grid over keyed points supporting insertion, removal and nearest neighbour queries
+    # the cell size follows the density of the points, so a query inspects a few cells on average
+    def __init__(self, cell=1.0):
+        self.cell = cell
+        self.cells = {}
+        self.points = {}
+        self.low = [math.inf, math.inf]
+        self.high = [-math.inf, -math.inf]
+
+    def __len__(self):
+        return len(self.points)
+
+    def __contains__(self, key):
+        return key in self.points
+
+    def _cell(self, point):
+        return (math.floor(point[0] / self.cell), math.floor(point[1] / self.cell))
+
+    def insert(self, key, point):
+        point = (float(point[0]), float(point[1]))
+        self.points[key] = point
+        self.cells.setdefault(self._cell(point), set()).add(key)
+        self.low = [min(self.low[0], point[0]), min(self.low[1], point[1])]
+        self.high = [max(self.high[0], point[0]), max(self.high[1], point[1])]
+        self._resize()
+
+    def remove(self, key):
+        point = self.points.pop(key)
+        cell = self._cell(point)
+        self.cells[cell].discard(key)
+        if not self.cells[cell]:
+            del self.cells[cell]
+
+    def _resize(self):
+        # rehash when the cell size is far from the mean spacing of the points
+        width = max(self.high[0] - self.low[0], self.high[1] - self.low[1])
+        if width <= 0:
+            return
+        target = width / math.sqrt(len(self.points))
+        if target / RESIZE_FACTOR <= self.cell <= target * RESIZE_FACTOR:
+            return
+        self.cell = target
+        self.cells = {}
+        for key, point in self.points.items():
+            self.cells.setdefault(self._cell(point), set()).add(key)
+
+    def nearest(self, point, k, exclude=()):
+        # up to k nearest keys sorted by distance, searched in growing rings of cells around the point
+        if not self.points:
+            return []
+        center_x, center_y = self._cell(point)
+        low_x, low_y = self._cell(self.low)
+        high_x, high_y = self._cell(self.high)
+        last_ring = max(center_x - low_x, high_x - center_x, center_y - low_y, high_y - center_y, 0)
+        found = []
+        ring = 0
+        while ring <= last_ring:
+            if ring == 0:
+                cells = [(center_x, center_y)]
+            else:
+                cells = [(center_x + dx, center_y + dy) for dx in (-ring, ring) for dy in range(-ring, ring + 1)]
+                cells += [(center_x + dx, center_y + dy) for dy in (-ring, ring) for dx in range(-ring + 1, ring)]
+            for cell in cells:
+                for key in self.cells.get(cell, ()):
+                    if key in exclude:
+                        continue
+                    other = self.points[key]
+                    found.append((math.hypot(other[0] - point[0], other[1] - point[1]), key))
+            # points outside the rings searched so far are further than ring cells away
+            if len(found) >= k and heapq.nsmallest(k, found)[-1][0] <= ring * self.cell:
+                break
+            ring += 1
+        return [key for _, key in heapq.nsmallest(k, found)]
+
+def neighbour_lists(points, k):
+    # indices of k nearest other points for every point, shape (n, k)
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    count = len(points)
+    k = min(k, count - 1)
+    if k <= 0:
+        return np.empty((count, 0), dtype=np.intp)
+    _, indices = cKDTree(points).query(points, k + 1)
+    indices = indices.reshape(count, k + 1)
+    # drop the point itself, duplicates may push it out of the first column
+    others = indices != np.arange(count)[:, None]
+    order = np.argsort(~others, axis=1, kind="stable")
+    return np.take_along_axis(indices, order, axis=1)[:, :k]
+
+def delaunay_edges(points):
+    # candidate edges (first, second) that contain a euclidean minimum spanning tree
+    # duplicates are joined to their first occurrence, collinear points are chained along their line
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    unique, index, inverse = np.unique(points, axis=0, return_index=True, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    duplicates = np.flatnonzero(index[inverse] != np.arange(len(points)))
+
+    triangulation = None
+    if len(unique) >= 3:
+        try:
+            triangulation = Delaunay(unique)
+        except QhullError:
+            pass
+    if triangulation is None:
+        # np.unique sorts lexicographically, so collinear points are in order along their line
+        chain = np.arange(len(unique))
+        edges = np.column_stack((chain[:-1], chain[1:]))
+    else:
+        simplices = triangulation.simplices
+        edges = [simplices[:, [0, 1]], simplices[:, [1, 2]], simplices[:, [0, 2]]]
+        # points qhull left out of the triangulation join their nearest vertex
+        if len(triangulation.coplanar):
+            edges.append(triangulation.coplanar[:, [0, 2]])
+        edges = np.unique(np.sort(np.concatenate(edges), axis=1), axis=0)
+
+    first = np.concatenate((index[edges[:, 0]], index[inverse[duplicates]]))
+    second = np.concatenate((index[edges[:, 1]], duplicates))
+    return np.minimum(first, second), np.maximum(first, second)
+
+def nearest_sites(points, sites, k=1):
+    # indices of k nearest sites for every point sorted by distance, shape (n, k)
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    sites = np.asarray(sites, dtype=np.float64).reshape(-1, 2)
+    k = min(k, len(sites))
+    if k <= 0 or len(points) == 0:
+        return np.empty((len(points), max(k, 0)), dtype=np.intp)
+    _, indices = cKDTree(sites).query(points, k)
+    return np.asarray(indices, dtype=np.intp).reshape(len(points), k)
@@ -1,16 +1,124 @@
 import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, nullcontext
 import numpy as np
-from scipy.optimize import minimize
+from scipy.sparse import coo_matrix, csr_matrix
+from scipy.sparse.csgraph import minimum_spanning_tree
+from scipy.spatial import cKDTree
+from distances import PointStore
+from executors import bounded_map
+from spatial import SpatialHash, delaunay_edges
+
+RELAXATION_TOLERANCE = 1e-7
+COINCIDENCE = 1e-12
+MAX_SWEEPS = 10000
+INSERT_CANDIDATES = 8
+PARTITION_SIZE = 2000
+BORDER_NEIGHBOURS = 8
+QUERY_ROWS = 65536
+ANYTIME_INTERVAL = 0.1
+
+class Vertices:
+    # points keyed by int ids in a growable (capacity, 2) array, alive marks the ids in use
+    # a single point is read as an (x, y) tuple, take and put read and write many ids as arrays
+    # ids are iterated in increasing order, which is the order they were added in as ids are never reused
+    def __init__(self, points=(), keys=None):
+        if isinstance(points, dict):
+            keys = list(points)
+            points = list(points.values())
+        points = np.array(points, dtype=np.float64).reshape(-1, 2)
+        keys = np.arange(len(points)) if keys is None else np.asarray(keys, dtype=np.intp)
+        capacity = int(keys.max()) + 1 if len(keys) else 0
+        self.positions = np.zeros((capacity, 2), dtype=np.float64)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.positions[keys] = points
+        self.alive[keys] = True
+        self.count = int(np.count_nonzero(self.alive))
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, key):
+        return 0 <= key < len(self.alive) and bool(self.alive[key])
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def keys(self):
+        return np.flatnonzero(self.alive).tolist()
+
+    def end(self):
+        # one past the largest id in use
+        alive = np.flatnonzero(self.alive)
+        return int(alive[-1]) + 1 if len(alive) else 0
+
+    def __getitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        x, y = self.positions[key].tolist()
+        return x, y
+
+    def __setitem__(self, key, point):
+        self.grow(key + 1)
+        self.positions[key] = point
+        if not self.alive[key]:
+            self.alive[key] = True
+            self.count += 1
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self.alive[key] = False
+        self.count -= 1
+
+    def grow(self, size):
+        if size > len(self.alive):
+            capacity = max(size, 2 * len(self.alive))
+            self.positions = np.concatenate((self.positions, np.zeros((capacity - len(self.alive), 2))))
+            self.alive = np.concatenate((self.alive, np.zeros(capacity - len(self.alive), dtype=bool)))
+
+    def take(self, keys):
+        # (len(keys), 2) array of the points of keys, which must be in use
+        return self.positions[np.asarray(keys, dtype=np.intp)]
+
+    def put(self, keys, points):
+        # set points of keys in bulk, adding the ids not in use yet
+        keys = np.asarray(keys, dtype=np.intp)
+        if len(keys) == 0:
+            return
+        self.grow(int(keys.max()) + 1)
+        self.positions[keys] = points
+        self.count += int(np.count_nonzero(~self.alive[keys]))
+        self.alive[keys] = True
 
 class Graph:
     def __init__(self, vertices):
+        # vertices is Vertices, a dict of points keyed by int or an (n, 2) array keyed by row
+        if not isinstance(vertices, Vertices):
+            vertices = Vertices(vertices)
         self.V = len(vertices)
         self.vertices = vertices
-        self.steiner_points = []
+        # steiner points of insert_steiner_points stay in arrays until steiner_points or dependents is asked for
+        self._steiner_points = {}
+        self._dependents = {}
+        self.splits = None
         self.graph = []
-        self.neighboors = {}
+        # the steiner topology is an (m, 2) array of edges until neighboors is asked for
+        self._neighboors = {}
+        self.topology = None
+        # edges of the last mst as an (m, 2) array in increasing length
+        self.tree_edges = None
         self.mst_edges = []
         self.total_length = 0
+        self.next_key = vertices.end()
+        # state of incremental updates, created by the first insert or remove from the terminal mst of the build
+        self.terminal_edges = None
+        self.terminals = None
+        self.terminal_neighboors = None
+        self.index = None
+        self.topology_length = 0
 
     def add_edge(self, u, v, w):
         self.graph.append([u, v, w])
@@ -36,18 +144,12 @@ class Graph:
         magnitude_AB = math.sqrt(vector_AB[0]**2 + vector_AB[1]**2)
         magnitude_BC = math.sqrt(vector_BC[0]**2 + vector_BC[1]**2)
 
-        angle_radians = math.acos(dot_product / (magnitude_AB * magnitude_BC))
+        angle_radians = math.acos(max(-1.0, min(1.0, dot_product / (magnitude_AB * magnitude_BC))))
 
         angle_degrees = math.degrees(angle_radians)
 
         return angle_degrees
 
-    def search(self, parent, i):
-        # search for parent vertex in Kruskal algorithm
-        if parent[i] == i:
-            return i
-        return self.search(parent, parent[i])
-    
     def fill_neighboors(self, mst):
         # get list of neighbooring vertices for each vertex
         for u, v in mst: 
@@ -60,50 +162,26 @@ class Graph:
             else:
                 self.neighboors[v] = [u]
 
-    def apply_union(self, parent, rank, x, y):
-        # unite two sections of graph
-        xroot = self.search(parent, x)
-        yroot = self.search(parent, y)
-        if rank[xroot] < rank[yroot]:
-            parent[xroot] = yroot
-        elif rank[xroot] > rank[yroot]:
-            parent[yroot] = xroot
-        else:
-            parent[yroot] = xroot
-            rank[xroot] += 1
- 
     def mst(self):
-        # kruskal algorithm for finding minimum spanning tree
-        self.graph = []
+        # minimum spanning tree over delaunay edges, which contain the euclidean minimum spanning tree
         self.V = len(self.vertices)
-        keys = list(self.vertices.keys())
-        for key1 in keys[:-1]:
-            for key2 in keys[key1 + 1:]:
-                self.add_edge(key1, key2, Graph.distance(self.vertices[key1], self.vertices[key2]))
-        result = []
-        i, e = 0, 0
-        self.graph = sorted(self.graph, key=lambda item: item[2])
-        parent = []
-        rank = []
-        for node in range(self.V):
-            parent.append(node)
-            rank.append(0)
-        while e < self.V - 1:
-            u, v, w = self.graph[i]
-            i = i + 1
-            x = self.search(parent, u)
-            y = self.search(parent, v)
-            if x != y:
-                e = e + 1
-                result.append([u, v, w])
-                self.apply_union(parent, rank, x, y)
-        self.total_length = sum([w for _, _, w in result])
-        self.mst_edges = [(u,v) for u, v, _ in result]
+        keys = np.flatnonzero(self.vertices.alive)
+        store = PointStore(self.vertices.take(keys))
+        first, second = delaunay_edges(store.points)
+        # zero weights would be read as missing edges
+        weights = np.maximum(store.pairs(first, second), np.finfo(np.float64).tiny)
+        tree = minimum_spanning_tree(coo_matrix((weights, (first, second)), shape=(self.V, self.V))).tocoo()
+        edges = np.sort(np.column_stack((tree.row, tree.col)).astype(np.intp), axis=1)
+        lengths = store.pairs(edges[:, 0], edges[:, 1])
+        order = np.argsort(lengths, kind="stable")
+        self.total_length = float(lengths.sum())
+        self.mst_edges = None
+        self.tree_edges = keys[edges[order]]
 
     def min_angle_and_point(self, u, v):
         min_angle = 180
         point = 0
-        if len(self.neighboors[v]) < 2:
+        if len(self.neighboors[v]) < 2 or self.vertices[u] == self.vertices[v]:
             return min_angle, point
         neighboors = self.neighboors[v]
         for neighboor in neighboors:
@@ -114,58 +192,710 @@ class Graph:
                 point = neighboor
         return min_angle, point        
 
-    def objective_function(self, candidate, vertices):
-        return sum(Graph.distance(candidate, vertex) for vertex in vertices)
-    
-    def fermat_point(self, vertices, initial_guess):
-        # constraints = ({'type': 'ineq', 'fun': lambda x: sum(x) - 1})
-        # result = minimize(self.objective_function, initial_guess, args=(vertices,), constraints=constraints, method='COBYLA')
+    def relax(self, keys=None, tolerance=RELAXATION_TOLERANCE, max_sweeps=MAX_SWEEPS):
+        # move steiner points to fermat points of their neighbours with weiszfeld iterations, returns number of sweeps
+        sweep = 0
+        for sweep, _, _ in self.relaxation(keys, tolerance, max_sweeps):
+            pass
+        return sweep
 
-        result = minimize(self.objective_function, initial_guess, args=(vertices,), method='Nelder-Mead')
+    def relaxation(self, keys=None, tolerance=RELAXATION_TOLERANCE, max_sweeps=MAX_SWEEPS):
+        # relax as generator of sweep number, keys and their positions after every sweep
+        # all points are updated at once per sweep, vardi-zhang step handles points lying on a neighbour
+        # vertices are written back when the generator ends or is closed
+        if keys is None and self.splits is not None and self.topology is not None and not self._steiner_points:
+            # all steiner points are still in arrays, so are their neighbours
+            keys = self.splits[0]
+            if len(keys) == 0:
+                return
+            positions = self.vertices.positions[:self.vertices.end()].copy()
+            rows = keys
+            indptr, neighbours, _ = adjacency(len(positions), self.topology[:, 0], self.topology[:, 1])
+            degree = np.diff(indptr)[keys]
+            columns = np.arange(degree.max())
+            mask = columns < degree[:, None]
+            anchors = neighbours[np.where(mask, indptr[keys][:, None] + columns, 0)]
+        else:
+            keys = list(self.steiner_points) if keys is None else keys
+            if len(keys) == 0:
+                return
+            all_keys = list(dict.fromkeys(keys + [neighboor for key in keys for neighboor in self.neighboors[key]]))
+            index = {key: i for i, key in enumerate(all_keys)}
+            positions = self.vertices.take(all_keys)
+            rows = np.array([index[key] for key in keys])
+            degree = max(len(self.neighboors[key]) for key in keys)
+            anchors = np.zeros((len(keys), degree), dtype=np.intp)
+            mask = np.zeros((len(keys), degree), dtype=bool)
+            for row, key in enumerate(keys):
+                neighboors = [index[neighboor] for neighboor in self.neighboors[key]]
+                anchors[row, :len(neighboors)] = neighboors
+                mask[row, :len(neighboors)] = True
+        # stop when no point moves by more than tolerance relative to the size of the instance
+        extent = np.ptp(positions[np.concatenate((rows, anchors[mask]))], axis=0).max()
+        threshold = tolerance * max(extent, 1.0)
+        coincidence = COINCIDENCE * max(extent, 1.0)
+
+        try:
+            for sweep in range(1, max_sweeps + 1):
+                current = positions[rows]
+                neighbours = positions[anchors]
+                delta = neighbours - current[:, None, :]
+                lengths = np.hypot(delta[..., 0], delta[..., 1])
+                coincident = mask & (lengths <= coincidence)
+                active = mask & ~coincident
+                weights = np.where(active, 1.0 / np.where(active, lengths, 1.0), 0.0)
+                weight_sums = weights.sum(axis=1)
+                pull = (weights[..., None] * delta).sum(axis=1)
+                target = current + pull / np.where(weight_sums > 0, weight_sums, 1.0)[:, None]
+                pull_length = np.hypot(pull[:, 0], pull[:, 1])
+                ratio = np.where(pull_length > 0, coincident.sum(axis=1) / np.where(pull_length > 0, pull_length, 1.0), 1.0)
+                ratio = np.minimum(ratio, 1.0)[:, None]
+                new = (1.0 - ratio) * target + ratio * current
+                moved = np.hypot(*(new - current).T).max()
+                positions[rows] = new
+                yield sweep, keys, new
+                if moved <= threshold:
+                    break
+        finally:
+            self.vertices.put(keys, positions[rows])
+
+    @property
+    def mst_edges(self):
+        # edges of the tree, listed from the steiner topology after incremental updates
+        if self._mst_edges is None:
+            self._mst_edges = [(u, v) for u, v in self.edge_array().tolist()]
+        return self._mst_edges
+
+    @mst_edges.setter
+    def mst_edges(self, edges):
+        self._mst_edges = edges
+        self.tree_edges = None
+
+    def edge_array(self):
+        # edges of mst_edges as an (m, 2) array of keys, without listing them
+        if self.tree_edges is not None:
+            return self.tree_edges
+        if self._mst_edges is not None:
+            return np.array(self._mst_edges, dtype=np.intp).reshape(-1, 2)
+        if self.topology is not None:
+            return self.topology
+        return np.array([(u, v) for u in self._neighboors for v in self._neighboors[u] if u < v], dtype=np.intp).reshape(-1, 2)
+
+    @property
+    def neighboors(self):
+        # neighbour lists of the steiner topology, built from its edge array on first use
+        if self.topology is not None:
+            indptr, neighbours, _ = adjacency(len(self.vertices.alive), self.topology[:, 0], self.topology[:, 1])
+            indptr, neighbours = indptr.tolist(), neighbours.tolist()
+            self._neighboors = {key: neighbours[indptr[key]:indptr[key + 1]] for key in self.vertices.keys()}
+            self.topology = None
+        return self._neighboors
+
+    @neighboors.setter
+    def neighboors(self, neighboors):
+        self._neighboors = neighboors
+        self.topology = None
+
+    @property
+    def steiner_points(self):
+        # (u, v, point) of every steiner point by key, see split
+        self.expand_splits()
+        return self._steiner_points
+
+    @property
+    def dependents(self):
+        # steiner points inserted around a steiner point, by its key
+        self.expand_splits()
+        return self._dependents
+
+    def expand_splits(self):
+        # move the steiner points of insert_steiner_points from arrays to steiner_points and dependents
+        if self.splits is None:
+            return
+        added, splits = self.splits
+        self.splits = None
+        for key, (u, v, point) in zip(added.tolist(), splits.tolist()):
+            self._steiner_points[key] = (u, v, point)
+            if point in self._steiner_points:
+                self._dependents.setdefault(point, set()).add(key)
+
+    def steiner_keys(self):
+        # keys of steiner points as an array, in the order of steiner_points
+        if self.splits is None:
+            return np.array(list(self._steiner_points), dtype=np.intp)
+        return np.concatenate((np.array(list(self._steiner_points), dtype=np.intp), self.splits[0]))
+
+    def edge_lengths(self, edges):
+        # lengths of an (m, 2) array of edges given by keys
+        delta = self.vertices.take(edges[:, 0]) - self.vertices.take(edges[:, 1])
+        return np.hypot(delta[:, 0], delta[:, 1])
+
+    def link(self, u, v):
+        self.neighboors[u].append(v)
+        self.neighboors[v].append(u)
+        self.topology_length += Graph.distance(self.vertices[u], self.vertices[v])
+
+    def unlink(self, u, v):
+        self.neighboors[u].remove(v)
+        self.neighboors[v].remove(u)
+        self.topology_length -= Graph.distance(self.vertices[u], self.vertices[v])
+
+    def insert_steiner_point(self, m, n):
+        # replace two edges meeting at an angle below 120 degrees by a steiner point, returns its key
+        u, v = m, n 
+        if u not in self.neighboors[v]: return None
+        min_angle, point = self.min_angle_and_point(u, v)
+        if min_angle >= 120: 
+            u, v = n, m
+            min_angle, point = self.min_angle_and_point(u, v)
+        if min_angle >= 120:
+            return None
+        return self.split(u, v, point)
+
+    def split(self, u, v, point):
+        # steiner point at v taking over edges from v to u and point, returns its key
+        # it starts at the position of v, so the length of the tree does not change
+        neighboors = self.neighboors
+        neighboors[v].remove(u)
+        neighboors[u].remove(v)
+        neighboors[v].remove(point)
+        neighboors[point].remove(v)
+        steiner_point_index = self.next_key
+        self.next_key += 1
+        self.vertices[steiner_point_index] = self.vertices[v]
+        self.steiner_points[steiner_point_index] = (u, v, point)
+        neighboors[steiner_point_index] = [u, v, point]
+        for key in (u, v, point):
+            neighboors[key].append(steiner_point_index)
+            if key in self.steiner_points:
+                self.dependents.setdefault(key, set()).add(steiner_point_index)
+        return steiner_point_index
+
+    def insert_steiner_points(self):
+        # insert_steiner_point over all edges of the terminal tree, done in rounds on edge arrays
+        # every round tests all edges at once and splits those not sharing an edge with an earlier one in mst order,
+        # the rest is tested again once their apexes changed
+        keys = np.flatnonzero(self.vertices.alive)
+        edges = self.edge_array()
+        if np.any(keys != np.arange(len(keys))):
+            sorter = np.argsort(keys)
+            edges = sorter[np.searchsorted(keys, edges, sorter=sorter)]
+        positions = self.vertices.take(keys)
+        positions, edges, splits = steiner_splits(positions, edges)
+        added = self.next_key + np.arange(len(splits), dtype=np.intp)
+        self.next_key += len(splits)
+        self.vertices.put(added, positions[len(keys):])
+        keys = np.concatenate((keys, added))
+        self.expand_splits()
+        self.splits = (added, keys[splits])
+        self.topology = keys[edges]
+
+    def remove_steiner_point(self, key):
+        # undo insertion of a steiner point, points inserted later around it must be removed first
+        u, v, point = self.steiner_points.pop(key)
+        self.unlink(key, u)
+        self.unlink(key, v)
+        self.unlink(key, point)
+        del self.neighboors[key]
+        del self.vertices[key]
+        self.dependents.pop(key, None)
+        for other in (u, v, point):
+            if other in self.dependents:
+                self.dependents[other].discard(key)
+        self.link(v, u)
+        self.link(v, point)
+
+    def build(self):
+        # terminal mst with steiner points inserted at angles below 120 degrees and relaxed
+        for _ in self.building():
+            pass
+
+    def building(self):
+        # build as generator, yields None once the terminal mst is found and then what relaxation yields
+        # edges are listed from the steiner topology after the insertion
+        self.mst()
+        self.terminal_edges = self.tree_edges
+        yield None
+        self.insert_steiner_points()
+        self.mst_edges = None
+        try:
+            yield from self.relaxation()
+        finally:
+            self.topology_length = float(self.edge_lengths(self.edge_array()).sum())
+
+    def to_tree(self):
+        # Tree of the vertices and edges, terminals first and steiner points in the order of steiner_points
+        keys = np.flatnonzero(self.vertices.alive)
+        steiner_keys = self.steiner_keys()
+        keys = np.concatenate((keys[~np.isin(keys, steiner_keys)], steiner_keys))
+        index = np.zeros(len(self.vertices.alive), dtype=np.intp)
+        index[keys] = np.arange(len(keys))
+        positions = self.vertices.take(keys).reshape(-1, 2)
+        return Tree(positions, index[self.edge_array()], len(keys) - len(steiner_keys))
 
-        return (result.x[0], result.x[1])
-        
     def steiner(self):
         # find minimal steiner tree
+        self.build()
         self.mst()
-        self.fill_neighboors(self.mst_edges)
-        for m, n in self.mst_edges:
-            u, v = m, n 
-            if u not in self.neighboors[v]: continue
-            min_angle, point = self.min_angle_and_point(u, v)
-            if min_angle >= 120: 
-                u, v = n, m
-                min_angle, point = self.min_angle_and_point(u, v)
-            if min_angle < 120:    
-                self.neighboors[v] = [x for x in self.neighboors[v] if x != u and x != point]
-                self.neighboors[u] = [x for x in self.neighboors[u] if x != v]
-                self.neighboors[point] = [x for x in self.neighboors[point] if x != v]
-                steiner_point_index = len(self.vertices)
-                self.vertices[steiner_point_index] = self.vertices[v]
-                self.steiner_points.append(steiner_point_index)
-                self.neighboors[steiner_point_index] = [u, v, point]
-                self.neighboors[u].append(steiner_point_index)
-                self.neighboors[v].append(steiner_point_index)
-                self.neighboors[point].append(steiner_point_index)
-        eps = 100
-        while eps > 0.001:
-            for key in self.steiner_points:
-                initial_steiner_position = self.vertices[key]
-                vertices = []
-                neigboors = self.neighboors[key]
-                for neighboor in neigboors:
-                    coords = self.vertices[neighboor]
-                    vertices.append([i for i in coords])
-                vertices = np.array(vertices)    
-                fermat_point = self.fermat_point(vertices, self.vertices[key])
-                self.vertices[key] = fermat_point
-                improvement = Graph.distance(initial_steiner_position, fermat_point)
-                if improvement < eps:
-                    eps = improvement
-     
-        self.mst()
+
+    def start_incremental(self):
+        # switch from the final mst to the steiner topology that incremental updates repair
+        if self.terminal_edges is None:
+            self.build()
+        if self.terminals is None:
+            keys = np.flatnonzero(self.vertices.alive)
+            self.terminals = set(keys[~np.isin(keys, self.steiner_keys())].tolist())
+            self.terminal_neighboors = {key: set() for key in self.terminals}
+            for u, v in self.terminal_edges.tolist():
+                self.terminal_neighboors[u].add(v)
+                self.terminal_neighboors[v].add(u)
+        if self.index is None:
+            self.index = SpatialHash()
+            for key in self.terminals:
+                self.index.insert(key, self.vertices[key])
+        self.mst_edges = None
+        self.total_length = self.topology_length
+
+    def tree_path(self, a, b):
+        # path between terminals a and b in the terminal tree, searched from both ends
+        parents = [{a: None}, {b: None}]
+        frontiers = [[a], [b]]
+        while frontiers[0] and frontiers[1]:
+            side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+            frontier = []
+            for x in frontiers[side]:
+                for y in self.terminal_neighboors[x]:
+                    if y in parents[side]:
+                        continue
+                    parents[side][y] = x
+                    if y in parents[1 - side]:
+                        halves = []
+                        for tree in parents:
+                            half = [y]
+                            while tree[half[-1]] is not None:
+                                half.append(tree[half[-1]])
+                            halves.append(half)
+                        return halves[0][::-1] + halves[1][1:]
+                    frontier.append(y)
+            frontiers[side] = frontier
+        return None
+
+    def offer_edge(self, a, b, changed):
+        # add terminal edge a-b when it is shorter than the longest edge on the tree path it closes
+        weight = Graph.distance(self.vertices[a], self.vertices[b])
+        path = self.tree_path(a, b)
+        if path is not None:
+            lengths = [Graph.distance(self.vertices[x], self.vertices[y]) for x, y in zip(path, path[1:])]
+            longest = max(range(len(lengths)), key=lengths.__getitem__)
+            if lengths[longest] <= weight:
+                return
+            x, y = path[longest], path[longest + 1]
+            self.terminal_neighboors[x].discard(y)
+            self.terminal_neighboors[y].discard(x)
+            changed.update((x, y))
+        self.terminal_neighboors[a].add(b)
+        self.terminal_neighboors[b].add(a)
+        changed.update((a, b))
+
+    def repair(self, changed):
+        # rebuild steiner points around terminals whose tree edges changed
+        region = set(changed)
+        while True:
+            # undoing a steiner point can reconnect a changed terminal to an older one
+            stack = [neighboor for key in changed if key in self.neighboors for neighboor in self.neighboors[key] if neighboor in self.steiner_points]
+            if not stack:
+                break
+            removed = set()
+            while stack:
+                key = stack.pop()
+                if key in removed:
+                    continue
+                removed.add(key)
+                stack.extend(self.dependents.get(key, ()))
+            for key in sorted(removed, reverse=True):
+                region.update(other for other in self.steiner_points[key] if other in self.terminals)
+                self.remove_steiner_point(key)
+        # all neighbours of changed terminals are terminals now, align them with the terminal tree
+        for key in changed:
+            current = set(self.neighboors.get(key, ()))
+            target = self.terminal_neighboors.get(key, set())
+            for other in current - target:
+                self.unlink(key, other)
+            for other in target - current:
+                if key not in self.neighboors[other]:
+                    self.link(key, other)
+        region = [key for key in region if key in self.terminals]
+        edges = {(min(u, v), max(u, v)) for u in region for v in self.terminal_neighboors[u]}
+        edges = sorted(edges, key=lambda edge: Graph.distance(self.vertices[edge[0]], self.vertices[edge[1]]))
+        inserted = [key for key in (self.insert_steiner_point(m, n) for m, n in edges) if key is not None]
+        if inserted:
+            touched = {(min(u, v), max(u, v)) for u in inserted for v in self.neighboors[u]}
+            self.topology_length -= sum(Graph.distance(self.vertices[u], self.vertices[v]) for u, v in touched)
+            self.relax(inserted)
+            self.topology_length += sum(Graph.distance(self.vertices[u], self.vertices[v]) for u, v in touched)
+        self.mst_edges = None
+        self.total_length = self.topology_length
+
+    def insert_terminal(self, point):
+        # add a terminal and repair the tree around it, returns key of the new vertex
+        self.start_incremental()
+        key = self.next_key
+        self.next_key += 1
+        self.vertices[key] = (float(point[0]), float(point[1]))
+        self.terminals.add(key)
+        self.terminal_neighboors[key] = set()
+        self.neighboors[key] = []
+        self.V = len(self.vertices)
+        changed = {key}
+        for other in self.index.nearest(self.vertices[key], INSERT_CANDIDATES):
+            self.offer_edge(key, other, changed)
+        self.index.insert(key, self.vertices[key])
+        self.repair(changed)
+        return key
+
+    def remove_terminal(self, key):
+        # delete a terminal, reconnect its tree neighbours and repair the tree around them
+        self.start_incremental()
+        orphans = sorted(self.terminal_neighboors.pop(key))
+        for other in orphans:
+            self.terminal_neighboors[other].discard(key)
+        self.terminals.discard(key)
+        self.index.remove(key)
+        changed = {key, *orphans}
+        # orphaned subtrees are joined by the mst of the former neighbours, then improved with nearby edges
+        pairs = sorted(((Graph.distance(self.vertices[a], self.vertices[b]), a, b) for i, a in enumerate(orphans) for b in orphans[i + 1:]))
+        for _, a, b in pairs:
+            self.offer_edge(a, b, changed)
+        for a in orphans:
+            for b in self.index.nearest(self.vertices[a], INSERT_CANDIDATES, exclude={a}):
+                self.offer_edge(a, b, changed)
+        self.repair(changed)
+        del self.neighboors[key]
+        del self.vertices[key]
+        self.V = len(self.vertices)
+        self.mst_edges = None
+
+def adjacency(count, first, second):
+    # csr neighbour arrays of an undirected graph, neighbours of a vertex ordered as its edges are
+    sources = np.column_stack((first, second)).ravel()
+    targets = np.column_stack((second, first)).ravel()
+    order = np.argsort(sources, kind="stable")
+    indptr = np.concatenate(([0], np.cumsum(np.bincount(sources, minlength=count))))
+    return indptr, targets[order], order
+
+def angle_candidates(positions, first, second, apexes=None):
+    # angle test of insert_steiner_point for all edges of a tree at once, with the apex at second and at first
+    # returns whether some other neighbour of the apex makes an angle below 120 degrees with the edge, that neighbour
+    # with the smallest angle and its edge, compared by cosines as 2 dot + |p| |q| > 0, shapes (edges, 2)
+    # only apexes marked in the boolean array apexes are tested when given
+    count = len(positions)
+    indptr, neighbours, order = adjacency(count, first, second)
+    degree = np.diff(indptr)
+    apex = np.repeat(np.arange(count), degree)
+    entries = np.arange(len(neighbours)) if apexes is None else np.flatnonzero(apexes[apex])
+    # every tested entry of a row paired with every entry of the same row
+    repeats = degree[apex[entries]]
+    entry = np.repeat(entries, repeats)
+    other = indptr[apex[entry]] + np.arange(len(entry)) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+    valid = other != entry
+    entry, other = entry[valid], other[valid]
+    x, y = np.ascontiguousarray(positions[:, 0]), np.ascontiguousarray(positions[:, 1])
+    centre = apex[entry]
+    p_x, p_y = x[neighbours[entry]] - x[centre], y[neighbours[entry]] - y[centre]
+    q_x, q_y = x[neighbours[other]] - x[centre], y[neighbours[other]] - y[centre]
+    # neighbours at the apex have no angle
+    valid = ((p_x != 0) | (p_y != 0)) & ((q_x != 0) | (q_y != 0))
+    entry, other, p_x, p_y, q_x, q_y = entry[valid], other[valid], p_x[valid], p_y[valid], q_x[valid], q_y[valid]
+    dot = p_x * q_x + p_y * q_y
+    lengths = np.hypot(p_x, p_y) * np.hypot(q_x, q_y)
+    cosine = dot / lengths
+    # smallest angle of every entry, the first neighbour among equal ones as in min_angle_and_point
+    # pairs are grouped by entry, so the largest cosine of a group is found without sorting
+    starts = np.flatnonzero(np.diff(entry, prepend=-1))
+    largest = np.maximum.reduceat(cosine, starts) if len(starts) else cosine[:0]
+    ties = np.flatnonzero(cosine == np.repeat(largest, np.diff(np.append(starts, len(entry)))))
+    best = ties[np.diff(entry[ties], prepend=-1) != 0]
+    found = np.zeros(len(neighbours), dtype=bool)
+    point = np.zeros(len(neighbours), dtype=np.intp)
+    edge = np.zeros(len(neighbours), dtype=np.intp)
+    found[entry[best]] = 2 * dot[best] + lengths[best] > 0
+    point[entry[best]] = neighbours[other[best]]
+    edge[entry[best]] = order[other[best]] // 2
+    # entries of directed edges (second, first) and (first, second)
+    position = np.empty(len(order), dtype=np.intp)
+    position[order] = np.arange(len(order))
+    position = position.reshape(-1, 2)[:, ::-1]
+    return found[position], point[position], edge[position]
+
+def steiner_splits(positions, edges):
+    # steiner points inserted into a tree given by rows of edges in priority order, see Graph.insert_steiner_points
+    # returns positions with the steiner points appended, edges of the new tree and (u, v, point) of every steiner point
+    # a split at v replaces edges v-u and v-point by s-u and s-point and adds s-v, s at the position of v
+    # only edges of the original tree are tested, so apexes are always its vertices
+    terminals = len(positions)
+    edges = edges.copy()
+    tested = np.ones(len(edges), dtype=bool)
+    apexes = None
+    splits = [np.empty((0, 3), dtype=np.intp)]
+    while tested.any():
+        found, points, point_edges = angle_candidates(positions, edges[:, 0], edges[:, 1], apexes)
+        found &= tested[:, None]
+        candidates = np.flatnonzero(found.any(axis=1))
+        if len(candidates) == 0:
+            break
+        side = np.where(found[candidates, 0], 0, 1)
+        apex = edges[candidates, 1 - side]
+        u = edges[candidates, side]
+        point = points[candidates, side]
+        point_edge = point_edges[candidates, side]
+        # a split consumes its edge and the edge to point, every edge goes to the earliest candidate claiming it
+        winner = np.full(len(edges), len(edges), dtype=np.intp)
+        np.minimum.at(winner, np.concatenate((candidates, point_edge)), np.concatenate((candidates, candidates)))
+        accepted = (winner[candidates] == candidates) & (winner[point_edge] == candidates)
+        steiner = len(positions) + np.arange(np.count_nonzero(accepted))
+        edges[candidates[accepted]] = np.column_stack((steiner, u[accepted]))
+        edges[point_edge[accepted]] = np.column_stack((steiner, point[accepted]))
+        edges = np.concatenate((edges, np.column_stack((steiner, apex[accepted]))))
+        tested[candidates[accepted]] = tested[point_edge[accepted]] = False
+        tested = np.concatenate((tested, np.zeros(len(steiner), dtype=bool)))
+        positions = np.concatenate((positions, positions[apex[accepted]]))
+        splits.append(np.column_stack((u, apex, point))[accepted])
+        # the geometry changed only around apexes, losers are tested again as well
+        apexes = np.zeros(len(positions), dtype=bool)
+        apexes[apex] = True
+        apexes[edges[candidates[~accepted]].ravel()] = True
+    return positions, edges, np.concatenate(splits)
 
 def steiner_tree(vertices): 
     g = Graph(vertices)
     g.steiner()
-    return g
\ No newline at end of file
+    return g
+
+def steiner_improvements(vertices, stop=None, interval=ANYTIME_INTERVAL, clock=time.perf_counter):
+    # steiner_tree as generator of improving (length, Tree, elapsed seconds) - the terminal mst first,
+    # then relaxed trees at most every interval seconds and the final tree
+    # stop is asked after every relaxation sweep, once it is true the tree so far is yielded and the search ends
+    # the mst and the insertion of steiner points are not interrupted, returns the graph like steiner_tree
+    started = clock()
+    g = Graph(vertices)
+    steps = g.building()
+    next(steps)
+    tree = g.to_tree()
+    best = tree.total_length
+    yield best, tree, clock() - started
+    base = None
+    last = clock()
+    stopped = False
+    try:
+        for _, _, relaxed in steps:
+            if base is None:
+                # steiner points follow the terminals in the order relaxation moves them
+                base = g.to_tree()
+            stopped = stop is not None and stop()
+            if stopped or clock() - last >= interval:
+                positions = base.positions.copy()
+                positions[base.terminals:] = relaxed
+                tree = Tree(positions, base.edges, base.terminals)
+                last = clock()
+                if tree.total_length < best:
+                    best = tree.total_length
+                    yield best, tree, last - started
+            if stopped:
+                break
+    finally:
+        steps.close()
+    if not stopped:
+        g.mst()
+        tree = g.to_tree()
+        if tree.total_length < best:
+            yield tree.total_length, tree, clock() - started
+    return g
+
+def partition(points, leaf_size=PARTITION_SIZE):
+    # split at the median of the wider side until parts hold at most leaf_size points, returns index arrays of parts
+    parts = []
+    stack = [np.arange(len(points))]
+    while stack:
+        indices = stack.pop()
+        if len(indices) <= leaf_size:
+            parts.append(indices)
+            continue
+        coordinates = points[indices]
+        axis = int(np.argmax(np.ptp(coordinates, axis=0)))
+        half = len(indices) // 2
+        order = np.argpartition(coordinates[:, axis], half)
+        stack += [indices[order[:half]], indices[order[half:]]]
+    return parts
+
+def solve_part(points):
+    # steiner tree of one part, returns positions of its steiner points and edges, steiner points numbered after the terminals
+    g = steiner_tree(points)
+    keys = np.flatnonzero(g.vertices.alive)
+    keys = keys[keys >= len(points)]
+    index = np.arange(len(g.vertices.alive))
+    index[keys] = len(points) + np.arange(len(keys))
+    steiner_points = g.vertices.take(keys).reshape(-1, 2)
+    return steiner_points, index[g.edge_array()]
+
+@contextmanager
+def _stage(timings, name, tracer):
+    begin = time.perf_counter()
+    with tracer.phase(name) if tracer is not None else nullcontext():
+        yield
+    timings[name] = time.perf_counter() - begin
+
+def stitch(positions, owners, first, second):
+    # spanning tree over the trees of parts and delaunay edges between their borders, returns its edges
+    # vertices near another part and one vertex of every part form the border, so the joined tree is connected
+    count = len(positions)
+    index = cKDTree(positions)
+    border = []
+    for start in range(0, count, QUERY_ROWS):
+        end = min(start + QUERY_ROWS, count)
+        _, near = index.query(positions[start:end], min(BORDER_NEIGHBOURS + 1, count))
+        near = near.reshape(end - start, -1)
+        border.append(start + np.flatnonzero((owners[near] != owners[start:end, None]).any(axis=1)))
+    border = np.concatenate(border)
+    border = np.union1d(border, np.unique(owners, return_index=True)[1])
+    join_first, join_second = delaunay_edges(positions[border])
+    join_first, join_second = border[join_first], border[join_second]
+    crossing = owners[join_first] != owners[join_second]
+    first = np.concatenate((first, join_first[crossing]))
+    second = np.concatenate((second, join_second[crossing]))
+    # zero weights would be read as missing edges
+    weights = np.maximum(np.hypot(*(positions[first] - positions[second]).T), np.finfo(np.float64).tiny)
+    tree = minimum_spanning_tree(coo_matrix((weights, (first, second)), shape=(count, count))).tocoo()
+    return tree.row.astype(np.intp), tree.col.astype(np.intp)
+
+def splice(g, changed, terminals, interior=None):
+    # drop steiner points left with fewer than three edges among changed vertices, joining the two neighbours of one
+    # vertices next to dropped points are added to changed
+    stack = [key for key in changed if key >= terminals]
+    while stack:
+        key = stack.pop()
+        if key not in g.neighboors or len(g.neighboors[key]) > 2 or (interior is not None and key not in interior):
+            continue
+        neighboors = list(g.neighboors[key])
+        for other in neighboors:
+            g.unlink(key, other)
+        if len(neighboors) == 2:
+            g.link(*neighboors)
+        del g.neighboors[key]
+        del g.vertices[key]
+        changed.discard(key)
+        changed.update(neighboors)
+        stack += [other for other in neighboors if other >= terminals]
+
+def reoptimize(g, changed, terminals, interior=None):
+    # drop steiner points left with fewer than three edges around changed vertices, then insert and relax new ones there
+    # only steiner points in interior are dropped when given, the graph may hold a part of the tree whose border lacks edges
+    splice(g, changed, terminals, interior)
+    edges = {(min(u, v), max(u, v)) for u in changed if u in g.neighboors for v in g.neighboors[u]}
+    edges = sorted(edges, key=lambda edge: Graph.distance(g.vertices[edge[0]], g.vertices[edge[1]]))
+    inserted = [key for key in (g.insert_steiner_point(m, n) for m, n in edges) if key is not None]
+    # a split at a steiner point leaves it with two edges, new points have all their edges in the graph
+    if interior is not None:
+        interior.update(inserted)
+    spliced = set(inserted) | {g.steiner_points[key][1] for key in inserted}
+    splice(g, spliced, terminals, interior)
+    inserted = [key for key in inserted if key in g.neighboors]
+    # steiner points that lost a neighbour to a splice are relaxed again with the new ones
+    spliced = [key for key in spliced if key >= terminals and key in g.neighboors and (interior is None or key in interior)]
+    g.relax(list(dict.fromkeys(inserted + spliced)))
+    return inserted
+
+class Tree:
+    # steiner tree in arrays, positions of terminals followed by steiner points and edges as rows of two indices
+    def __init__(self, positions, edges, terminals):
+        self.positions = positions
+        self.edges = edges
+        self.terminals = terminals
+        delta = positions[edges[:, 0]] - positions[edges[:, 1]]
+        self.total_length = float(np.hypot(delta[:, 0], delta[:, 1]).sum())
+
+    def __len__(self):
+        return len(self.positions)
+
+    @property
+    def steiner_points(self):
+        return self.positions[self.terminals:]
+
+def _neighbourhood(adjacency, mask, hops):
+    for _ in range(hops):
+        mask = mask | (adjacency @ mask.astype(np.int8) > 0)
+    return mask
+
+def local_reoptimize(positions, first, second, changed, terminals):
+    # reoptimize only the part of the tree within a few edges of changed vertices, the rest stays in arrays
+    # returns positions and edges with removed steiner points dropped and new ones appended
+    count = len(positions)
+    adjacency = csr_matrix((np.ones(2 * len(first), dtype=np.int8), (np.concatenate((first, second)), np.concatenate((second, first)))), shape=(count, count))
+    mask = np.zeros(count, dtype=bool)
+    mask[changed] = True
+    # interior vertices have all their neighbours in the graph
+    interior = _neighbourhood(adjacency, mask, 2)
+    local = _neighbourhood(adjacency, interior, 1)
+    keys = np.flatnonzero(local)
+    g = Graph(Vertices(positions[keys], keys))
+    g.next_key = count
+    g.neighboors = {key: [] for key in g.vertices}
+    inside = local[first] & local[second]
+    g.fill_neighboors(zip(first[inside].tolist(), second[inside].tolist()))
+    reoptimize(g, set(changed.tolist()), terminals, set(np.flatnonzero(interior).tolist()))
+    g.mst_edges = None
+
+    g.vertices.grow(g.next_key)
+    positions = np.concatenate((positions, g.vertices.positions[count:g.next_key]))
+    edges = np.concatenate((np.column_stack((first[~inside], second[~inside])), g.edge_array()))
+    alive = np.ones(len(positions), dtype=bool)
+    alive[keys] = g.vertices.alive[keys]
+    alive[count:] = g.vertices.alive[count:g.next_key]
+    remap = np.cumsum(alive) - 1
+    return positions[alive], remap[edges]
+
+def partitioned_steiner_tree(points, leaf_size=PARTITION_SIZE, workers=None, tracer=None):
+    # divide and conquer for large instances - terminals are partitioned by a kd split and parts solved in a process pool
+    # their trees are stitched along the borders and steiner points around the joins are rebuilt
+    # points may be a memory-mapped array, parts are read from it only when they are sent to a worker
+    # returns Tree and seconds spent in every stage
+    points = np.asarray(points).reshape(-1, 2)
+    timings = {}
+    with _stage(timings, "partition", tracer):
+        parts = partition(points, leaf_size)
+    with _stage(timings, "solve", tracer):
+        inputs = (np.asarray(points[part], dtype=np.float64) for part in parts)
+        if workers == 1 or len(parts) == 1:
+            results = list(map(solve_part, inputs))
+        else:
+            with ProcessPoolExecutor(workers) as executor:
+                results = list(bounded_map(executor, solve_part, inputs, 2 * (workers or os.cpu_count())))
+    with _stage(timings, "stitch", tracer):
+        # terminals keep their indices, steiner points of parts follow them
+        positions = [np.asarray(points, dtype=np.float64)]
+        owners = np.empty(len(points), dtype=np.intp)
+        owner_parts = [owners]
+        firsts, seconds = [], []
+        offset = len(points)
+        for k, (part, (steiner_points, edges)) in enumerate(zip(parts, results)):
+            owners[part] = k
+            keys = np.concatenate((part, offset + np.arange(len(steiner_points))))
+            firsts.append(keys[edges[:, 0]])
+            seconds.append(keys[edges[:, 1]])
+            positions.append(steiner_points)
+            owner_parts.append(np.full(len(steiner_points), k, dtype=np.intp))
+            offset += len(steiner_points)
+        del parts, results
+        positions = np.concatenate(positions)
+        owners = np.concatenate(owner_parts)
+        first, second = np.concatenate(firsts), np.concatenate(seconds)
+        tree_first, tree_second = stitch(positions, owners, first, second)
+    with _stage(timings, "optimize", tracer):
+        # vertices whose edges differ from the trees of parts
+        count = len(positions)
+        before = np.minimum(first, second) * count + np.maximum(first, second)
+        after = np.minimum(tree_first, tree_second) * count + np.maximum(tree_first, tree_second)
+        differing = np.concatenate((before[~np.isin(before, after)], after[~np.isin(after, before)]))
+        changed = np.unique(np.concatenate((differing // count, differing % count)))
+        positions, edges = local_reoptimize(positions, tree_first, tree_second, changed, len(points))
+        tree = Tree(positions, edges, len(points))
+    return tree, timings
@@ -1,108 +1,140 @@
 import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
 from tkinter import ttk
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.collections import LineCollection
+import numpy as np
+from rendering import Mailbox
 from steiner import steiner_tree
-import random
 import math
 
+POLL_INTERVAL = 50
+
 class SteinerTreePlotter:
-    def __init__(self, entry_x, entry_y, canvas) -> None:
+    # trees are found on a worker thread which publishes them to a mailbox
+    # the Tk thread polls it and updates one scatter and one LineCollection, trees it did not catch up with are dropped
+    def __init__(self, entry_x, entry_y, canvas, rng=None) -> None:
         self.vertices = {}
+        # generator or seed of random instances
+        self.rng = np.random.default_rng(rng)
         self.entry_x = entry_x
         self.entry_y = entry_y
         self.canvas = canvas
+        # tree of the plotted vertices, updated incrementally once found, only touched by the worker
+        self.graph = None
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.mailbox = Mailbox()
+        # trees found for cleared vertices are not shown
+        self.generation = 0
+        figure = canvas.figure
+        self.axes = figure.axes[0] if figure.axes else figure.add_subplot()
+        self.axes.set_xlabel('X-axis')
+        self.axes.set_ylabel('Y-axis')
+        self.axes.set_title('Vertex Plot')
+        self.points = self.axes.scatter([], [], color='blue')
+        self.lines = LineCollection([], linestyle='-', color='red')
+        self.axes.add_collection(self.lines)
+        self.text = figure.text(0.02, 0.98, '', fontsize=10, verticalalignment='top',
+            bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.5), visible=False)
+        self.poll()
+
+    def poll(self):
+        state = self.mailbox.take()
+        if state is not None and state[0] == self.generation:
+            _, segments, length = state
+            self.lines.set_segments(segments)
+            self.text.set_text(f'Total length: {length:.2f}')
+            self.text.set_visible(True)
+            self.canvas.draw_idle()
+        self.canvas.get_tk_widget().after(POLL_INTERVAL, self.poll)
 
     def plot_vertex(self):
         x = float(self.entry_x.get())
         y = float(self.entry_y.get())
         if (x, y) not in list(self.vertices.values()): 
             self.vertices[len(self.vertices)] = (x, y)
-        plt.scatter(x, y, color='blue')
-        plt.xlabel('X-axis')
-        plt.ylabel('Y-axis')
-        plt.title('Vertex Plot')
-        self.canvas.draw()
+            self.executor.submit(self.insert_vertex, self.generation, (x, y))
+        self.plot_vertices()
 
     def plot_vertices(self):
-        for vertex in list(self.vertices.values()):
-            x, y = vertex
-            if (x, y) not in list(self.vertices.values()): 
-                self.vertices[len(self.vertices)] = (x, y)
-            plt.scatter(x, y, color='blue')
-            plt.xlabel('X-axis')
-            plt.ylabel('Y-axis')
-            plt.title('Vertex Plot')
-        self.canvas.draw()
+        points = np.array(list(self.vertices.values()), dtype=float).reshape(-1, 2)
+        self.points.set_offsets(points)
+        self.axes.ignore_existing_data_limits = True
+        self.axes.update_datalim(points)
+        self.axes.autoscale_view()
+        self.canvas.draw_idle()
 
     def clear_plot(self):
-        self.vertices = {}
-        plt.clf()
-        plt.xlabel('X-axis')
-        plt.ylabel('Y-axis')
-        plt.title('Vertex Plot')
-        self.canvas.draw()
+        self.reset({})
+
+    def reset(self, vertices):
+        # forget the tree, the worker drops its graph before any later task
+        self.generation += 1
+        self.vertices = vertices
+        self.executor.submit(self.drop_graph)
+        self.lines.set_segments([])
+        self.text.set_visible(False)
+        self.plot_vertices()
 
     def steiner_tree(self): 
-        plt.clf()
-        plt.xlabel('X-axis')
-        plt.ylabel('Y-axis')
-        plt.title('Vertex Plot')
-        self.canvas.draw()
-        self.plot_vertices()   
-        if len(self.vertices) < 2: return
-        if len(self.vertices) == 2: 
-            x1, y1 = self.vertices[0]
-            x2, y2 = self.vertices[1]
+        self.executor.submit(self.find_tree, self.generation, dict(self.vertices))
+
+    def drop_graph(self):
+        self.graph = None
+
+    def insert_vertex(self, generation, point):
+        # worker task, extends a found tree by one terminal
+        if self.graph is not None:
+            self.graph.insert_terminal(point)
+            self.publish(generation)
+
+    def find_tree(self, generation, vertices):
+        # worker task
+        if len(vertices) < 2: return
+        if len(vertices) == 2: 
+            x1, y1 = vertices[0]
+            x2, y2 = vertices[1]
             distance = math.sqrt((x2 - x1)**2 + (y2 - y1)**2)
-            plt.gcf().text(0.02, 0.98, f'Total length: {distance:.2f}', fontsize=10,
-            verticalalignment='top', bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.5))
-            plt.plot([x1, x2], [y1, y2], linestyle='-', color='red')
-            self.canvas.draw()
+            self.mailbox.publish((generation, [[(x1, y1), (x2, y2)]], distance))
             return
-        orig_len = len(self.vertices)
-        g = steiner_tree(self.vertices)
-        plt.gcf().text(0.02, 0.98, f'Total length: {g.total_length:.2f}', fontsize=10,
-            verticalalignment='top', bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.5))
-        for edge in g.mst_edges:
-            v1, v2 = edge
-            x1, y1 = self.vertices[v1]
-            x2, y2 = self.vertices[v2]
-            plt.plot([x1, x2], [y1, y2], linestyle='-', color='red')
-        self.canvas.draw()
-        self.vertices = dict(list(self.vertices.items())[:orig_len])
+        if self.graph is None:
+            self.graph = steiner_tree(vertices)
+        self.publish(generation)
+
+    def publish(self, generation):
+        g = self.graph
+        segments = [(g.vertices[v1], g.vertices[v2]) for v1, v2 in g.mst_edges]
+        self.mailbox.publish((generation, segments, g.total_length))
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
     
     def setup(self, number): 
-        plt.clf()
-        plt.xlabel('X-axis')
-        plt.ylabel('Y-axis')
-        plt.title('Vertex Plot')
-        self.canvas.draw()
         if number == 1:
-            self.vertices = {
+            vertices = {
                 0: (0,0), 
                 1: (4,0), 
                 2: (2,3)
                 }
         elif number == 2:
-            self.vertices = {
+            vertices = {
                 0: (0,0), 
                 1: (0,1), 
                 2: (1,1), 
                 3: (1,0)
             }
         elif number == 3:
-            self.vertices = {}
+            vertices = {}
             for i in range(10):
                 for j in range(10): 
-                    self.vertices[len(self.vertices)] = (i**2,j**2)
+                    vertices[len(vertices)] = (i**2,j**2)
         elif number == 4:
-            self.vertices = {}
-            for _ in range(100): 
-                self.vertices[len(self.vertices)] = (random.uniform(0, 100.0), random.uniform(0, 100.0))
-        self.plot_vertices()            
+            vertices = dict(enumerate(map(tuple, self.rng.uniform(0, 100.0, (100, 2)).tolist())))
+        self.reset(vertices)
 
-def on_close(root):
+def on_close(root, plotter):
+    plotter.close()
     root.destroy()
 
 def on_figure_close(event, root):
@@ -156,7 +188,7 @@ def main():
     setup4_button = ttk.Button(root, text="Random setup", command= lambda: plotter.setup(4))
     setup4_button.grid(row=4, column=2, padx=5, pady=10)
 
-    root.protocol("WM_DELETE_WINDOW", lambda: on_close(root))
+    root.protocol("WM_DELETE_WINDOW", lambda: on_close(root, plotter))
 
     fig.canvas.mpl_connect('close_event', lambda event: on_figure_close(event, root))
 
@@ -0,0 +1,125 @@
+import json
+import math
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+import numpy as np
+
+BANDS_PER_DECADE = 1
+
+class Tracer:
+    # counters, phase timers and acceptance ratios per temperature band of the annealing
+    # phases are recorded as events exportable as JSON lines or in Chrome trace format
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.counters = defaultdict(int)
+        self.timers = defaultdict(float)
+        self.calls = defaultdict(int)
+        self.bands = defaultdict(lambda: [0, 0])
+        self.events = []
+
+    def now(self):
+        # microseconds since the tracer was created
+        return (time.perf_counter() - self.start) * 1e6
+
+    def count(self, name, value=1):
+        self.counters[name] += value
+
+    @contextmanager
+    def phase(self, name, event=True, **args):
+        # time a block, aggregated per name and recorded as an event unless it is too frequent
+        begin = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self.timers[name] += end - begin
+            self.calls[name] += 1
+            if event:
+                self.events.append({
+                    "name": name,
+                    "ph": "X",
+                    "ts": (begin - self.start) * 1e6,
+                    "dur": (end - begin) * 1e6,
+                    "pid": os.getpid(),
+                    "tid": threading.get_ident(),
+                    "args": args,
+                })
+
+    def timed(self, name, function):
+        # wrap a frequently called function, only aggregated time is kept
+        if function is None:
+            return None
+        def wrapper(*args, **kwargs):
+            with self.phase(name, event=False):
+                return function(*args, **kwargs)
+        return wrapper
+
+    def band(self, temperature):
+        # label of the temperature band, bands are equal slices of decades
+        if temperature <= 0:
+            return "0"
+        return self.label(math.floor(math.log10(temperature) * BANDS_PER_DECADE))
+
+    def label(self, index):
+        return f"{10 ** (index / BANDS_PER_DECADE):g}-{10 ** ((index + 1) / BANDS_PER_DECADE):g}"
+
+    def acceptance(self, level, temperature, accepted):
+        counts = self.bands[(level, self.band(temperature))]
+        counts[0] += 1
+        counts[1] += bool(accepted)
+
+    def acceptances(self, level, temperatures, flags):
+        # acceptance of a block of iterations, flags are 1 when accepted, 0 when rejected and negative without a proposal
+        proposed = flags >= 0
+        indices = np.floor(np.log10(temperatures[proposed]) * BANDS_PER_DECADE).astype(np.int64)
+        accepted = flags[proposed] == 1
+        for index in np.unique(indices):
+            band = indices == index
+            counts = self.bands[(level, self.label(int(index)))]
+            counts[0] += int(np.count_nonzero(band))
+            counts[1] += int(np.count_nonzero(accepted[band]))
+
+    def value(self, name, **values):
+        # counter event with current values, e.g. scores after an outer step
+        self.events.append({"name": name, "ph": "C", "ts": self.now(), "pid": os.getpid(), "tid": threading.get_ident(), "args": values})
+
+    def summary(self):
+        phases = {name: {"seconds": seconds, "calls": self.calls[name]} for name, seconds in self.timers.items()}
+        acceptance = defaultdict(dict)
+        for (level, band), (proposed, accepted) in self.bands.items():
+            acceptance[level][band] = {"proposed": proposed, "accepted": accepted, "ratio": accepted / proposed}
+        summary = {
+            "seconds": time.perf_counter() - self.start,
+            "counters": dict(self.counters),
+            "phases": phases,
+            "acceptance": dict(acceptance),
+        }
+        cache_lookups = self.counters["cache_hit"] + self.counters["cache_miss"]
+        if cache_lookups:
+            summary["cache_hit_ratio"] = self.counters["cache_hit"] / cache_lookups
+        # rendering happens inside the annealing phase
+        annealing = self.timers.get("anneal", 0.0) - self.timers.get("draw", 0.0)
+        if annealing > 0:
+            summary["iterations_per_second"] = self.counters["inner_iterations"] / annealing
+        return summary
+
+    def write_jsonl(self, path):
+        # one event per line followed by the summary
+        with open(path, "w") as file:
+            for event in self.events:
+                file.write(json.dumps(event) + "\n")
+            file.write(json.dumps({"name": "summary", "args": self.summary()}) + "\n")
+
+    def write_chrome(self, path):
+        # loadable in chrome://tracing or Perfetto
+        with open(path, "w") as file:
+            json.dump({"traceEvents": self.events, "otherData": self.summary()}, file)
+
+    def write(self, path, format="jsonl"):
+        if format == "chrome":
+            self.write_chrome(path)
+        else:
+            self.write_jsonl(path)
@@ -0,0 +1,96 @@
+import os
+import numpy as np
+
+EARTH_RADIUS = 6378.388
+GEO_PI = 3.141592
+CHUNK_ROWS = 65536
+EDGE_WEIGHT_TYPES = ("EUC_2D", "ATT", "GEO")
+
+# best known tour lengths
+OPTIMA = {
+    "pr107": 44303,
+}
+
+class Problem:
+    # TSPLIB instance with node coordinates in a (dimension, 2) array
+    def __init__(self, name, coordinates, edge_weight_type, comment=""):
+        self.name = name
+        self.coordinates = coordinates
+        self.edge_weight_type = edge_weight_type
+        self.comment = comment
+
+    def __len__(self):
+        return len(self.coordinates)
+
+    @property
+    def optimum(self):
+        return OPTIMA.get(self.name)
+
+    def pairs(self, first, second):
+        # TSPLIB distances of nodes first[k] and second[k], rounded as the format prescribes
+        a = self.coordinates[first]
+        b = self.coordinates[second]
+        if self.edge_weight_type == "EUC_2D":
+            return np.floor(np.hypot(a[..., 0] - b[..., 0], a[..., 1] - b[..., 1]) + 0.5)
+        if self.edge_weight_type == "ATT":
+            exact = np.sqrt(((a[..., 0] - b[..., 0]) ** 2 + (a[..., 1] - b[..., 1]) ** 2) / 10.0)
+            rounded = np.floor(exact + 0.5)
+            return np.where(rounded < exact, rounded + 1, rounded)
+        latitude_a, longitude_a = geo_radians(a[..., 0]), geo_radians(a[..., 1])
+        latitude_b, longitude_b = geo_radians(b[..., 0]), geo_radians(b[..., 1])
+        q1 = np.cos(longitude_a - longitude_b)
+        q2 = np.cos(latitude_a - latitude_b)
+        q3 = np.cos(latitude_a + latitude_b)
+        cosine = np.clip(0.5 * ((1.0 + q1) * q2 - (1.0 - q1) * q3), -1.0, 1.0)
+        return np.trunc(EARTH_RADIUS * np.arccos(cosine) + 1.0)
+
+    def tour_length(self, tour):
+        # length of closed tour given as sequence of node indices
+        tour = np.asarray(tour)
+        return int(np.sum(self.pairs(tour, np.roll(tour, -1))))
+
+def geo_radians(values):
+    # TSPLIB GEO coordinates are DDD.MM degrees and minutes
+    degrees = np.trunc(values)
+    minutes = values - degrees
+    return GEO_PI * (degrees + 5.0 * minutes / 3.0) / 180.0
+
+def load(path, out=None):
+    # streaming parser of TSPLIB files with NODE_COORD_SECTION
+    # coordinates are written into out when given, e.g. a memory-mapped (dimension, 2) array
+    name = os.path.splitext(os.path.basename(path))[0]
+    specification = {}
+    with open(path) as file:
+        while True:
+            line = file.readline()
+            if not line:
+                raise ValueError(f"{path}: missing NODE_COORD_SECTION")
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("NODE_COORD_SECTION"):
+                break
+            if line == "EOF":
+                raise ValueError(f"{path}: missing NODE_COORD_SECTION")
+            key, _, value = line.partition(":")
+            specification[key.strip().upper()] = value.strip()
+
+        edge_weight_type = specification.get("EDGE_WEIGHT_TYPE", "EUC_2D").upper()
+        if edge_weight_type not in EDGE_WEIGHT_TYPES:
+            raise ValueError(f"{path}: unsupported EDGE_WEIGHT_TYPE {edge_weight_type}")
+        if "DIMENSION" not in specification:
+            raise ValueError(f"{path}: missing DIMENSION")
+        dimension = int(specification["DIMENSION"])
+
+        coordinates = np.empty((dimension, 2), dtype=np.float64) if out is None else out
+        if coordinates.shape != (dimension, 2):
+            raise ValueError(f"{path}: expected output of shape {(dimension, 2)}, got {coordinates.shape}")
+        loaded = 0
+        while loaded < dimension:
+            rows = min(CHUNK_ROWS, dimension - loaded)
+            chunk = np.loadtxt(file, usecols=(1, 2), max_rows=rows, ndmin=2)
+            if len(chunk) == 0:
+                raise ValueError(f"{path}: expected {dimension} nodes, found {loaded}")
+            coordinates[loaded:loaded + len(chunk)] = chunk
+            loaded += len(chunk)
+    return Problem(specification.get("NAME", name), coordinates, edge_weight_type, specification.get("COMMENT", ""))